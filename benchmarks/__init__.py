@@ -0,0 +1 @@
+"""Benchmarks hors Streamlit du pipeline de données."""
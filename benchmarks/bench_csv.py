@@ -0,0 +1,71 @@
+"""Vérifie la lecture CSV (pyarrow, une passe) contre le moteur C de pandas et mesure les deux.
+
+Les fichiers générés dépassent le bloc de lecture de pyarrow (~1 Mo) et contiennent des
+champs multi-lignes (condition_specifique): la lecture doit réussir sans repli.
+
+Usage: python -m benchmarks.bench_csv [--rows 5000 100000]
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.bench_ingestion import load_source, resample
+from cadastre.files import read_csv
+
+
+class _Replis(logging.Handler):
+    """Compte les replis sur le moteur C signalés par cadastre.files"""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def check(path: str) -> tuple:
+    """(secondes pyarrow, secondes moteur C); échoue si les DataFrames diffèrent ou s'il y a eu repli"""
+    replis = _Replis()
+    logger = logging.getLogger("cadastre.files")
+    logger.addHandler(replis)
+    try:
+        start = time.perf_counter()
+        result = read_csv(path)
+        t_arrow = time.perf_counter() - start
+    finally:
+        logger.removeHandler(replis)
+    if replis.count:
+        # Levée explicite: la vérification tient aussi sous python -O
+        raise AssertionError(f"{path}: repli sur le moteur C")
+
+    start = time.perf_counter()
+    expected = pd.read_csv(path, sep=';', encoding='utf-8-sig')
+    t_c = time.perf_counter() - start
+    pd.testing.assert_frame_equal(result, expected)
+    return t_arrow, t_c
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[5_000, 100_000])
+    args = parser.parse_args()
+
+    source = load_source()
+    multilignes = source['condition_specifique'].astype(str).str.contains("\n").sum()
+    print(f"{multilignes} lignes sur {len(source)} avec un champ multi-lignes")
+    print(f"{'lignes':>10} {'Mo':>8} {'pyarrow (s)':>12} {'moteur C (s)':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.rows:
+            path = os.path.join(tmp, f"formations_{n_rows}.csv")
+            resample(source, n_rows).to_csv(path, sep=';', index=False, encoding='utf-8-sig')
+            t_arrow, t_c = check(path)
+            print(f"{n_rows:>10} {os.path.getsize(path) / 2**20:>8.2f} {t_arrow:>12.3f} {t_c:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
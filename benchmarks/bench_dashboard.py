@@ -0,0 +1,184 @@
+"""Benchmark sans Streamlit du pipeline de données et de chaque vue du dashboard.
+
+Chaque étape est exécutée sur des cadastres synthétiques (lignes du fichier réel
+rééchantillonnées) et mesurée en temps, en pic mémoire et, pour les figures, en
+taille du JSON envoyé au navigateur. Les résultats sont écrits en JSON pour être
+comparés d'une version à l'autre.
+
+Usage: python -m benchmarks.bench_dashboard [--sizes 10000 100000 1000000] [--output bench.json]
+"""
+import argparse
+import json
+import platform
+import resource
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import plotly
+import plotly.graph_objects as go
+
+from benchmarks.bench_ingestion import load_source, resample
+from cadastre import figures
+from cadastre.aggregates import CUBE_DIMENSIONS, AggregateCube
+from cadastre.export import export_file
+from cadastre.files import file_digest
+from cadastre.filters import FilterEngine
+from cadastre.geo import POSTAL_CODES_PATH, build_postal_index, enrich_with_geo_data, load_postal_codes
+from cadastre.grid import page_slice, sort_rows
+from cadastre.ingestion import load_data
+from cadastre.search import SEARCH_FIELDS, SearchIndex
+
+# Colonnes du fichier de référence, comme résolues par le colmap de l'app
+COLMAP = {
+    "intitule": "intitule", "organisme": "type_organisme", "denomination": "denomination_sociale",
+    "public": "public", "localisation": "localisation_potentielle", "province": "province",
+    "duree": "duree", "duree_h": "duree_h", "categorie_duree": "categorie_duree",
+    "qualifiante": "qualifiante", "certifiante": "certifiante",
+}
+FILTER_COLUMNS = tuple(COLMAP[k] for k in ["province", "organisme", "categorie_duree", "qualifiante", "certifiante"])
+CUBE_COLUMNS = {dim: COLMAP.get(dim, dim) for dim in CUBE_DIMENSIONS}
+DISPLAY_COLUMNS = [COLMAP[k] for k in ["intitule", "organisme", "denomination", "province", "localisation",
+                                       "categorie_duree", "duree", "qualifiante", "certifiante", "public"]]
+
+VUES = {
+    "Carte des Provinces": {
+        "province_map": lambda c: figures.province_map(c["cube"]),
+        "province_bar": lambda c: figures.province_bar(c["cube"]),
+        "province_pie": lambda c: figures.province_pie(c["cube"]),
+        "arrondissement_map": lambda c: figures.arrondissement_map(c["cube"]),
+        "arrondissement_bar": lambda c: figures.arrondissement_bar(c["cube"]),
+        "arrondissement_province_bar": lambda c: figures.arrondissement_province_bar(c["cube"]),
+        "ville_map": lambda c: figures.ville_map(c["cube"]),
+        "ville_bar": lambda c: figures.ville_bar(c["cube"]),
+    },
+    "Analyses": {
+        "organismes_bar": lambda c: figures.organismes_bar(c["cube"]),
+        "categories_duree_pie": lambda c: figures.categories_duree_pie(c["cube"]),
+        "cert_qual_bar": lambda c: figures.cert_qual_bar(c["cube"]),
+        "durees_histogram": lambda c: figures.durees_histogram(c["data"][[COLMAP["duree_h"]]].iloc[c["rows"]],
+                                                               COLMAP["duree_h"]),
+    },
+    "Graphiques Avancés": {
+        "hierarchy_sunburst": lambda c: figures.hierarchy_sunburst(c["cube"]),
+        "organismes_treemap": lambda c: figures.organismes_treemap(c["cube"]),
+        "durees_province_strip": lambda c: figures.durees_province_strip(
+            c["data"][[COLMAP["province"], COLMAP["duree_h"]]].iloc[c["rows"]], COLMAP),
+    },
+    "Données": {
+        "tri": lambda c: sort_rows(c["data"], c["rows"], COLMAP["intitule"]),
+        "page": lambda c: page_slice(c["data"], c["rows"], DISPLAY_COLUMNS, 1, 50),
+        "export_csv": lambda c: export_file("CSV (;)", c["data"], c["rows"], DISPLAY_COLUMNS),
+    },
+}
+
+
+def synthetic_csv(source: pd.DataFrame, n_rows: int, directory: Path) -> Path:
+    """Cadastre synthétique de n_rows lignes, codes externes rendus uniques"""
+    df = resample(source, n_rows)
+    df["codeexterne"] = df["codeexterne"].astype(str) + "-" + df.index.astype(str)
+    path = directory / f"formations_{n_rows}.csv"
+    df.to_csv(path, sep=";", index=False, encoding="utf-8")
+    return path
+
+
+def filter_chain(engine: FilterEngine) -> np.ndarray:
+    """Sélections typiques de la sidebar: deux provinces, trois types d'organisme, qualifiantes"""
+    selection = engine.all()
+    provinces = [p for p in engine.options(COLMAP["province"]) if p != "Non spécifié"][:2]
+    selection &= engine.mask(COLMAP["province"], provinces)
+    selection &= engine.mask(COLMAP["organisme"], engine.options(COLMAP["organisme"], selection)[:3])
+    selection &= engine.mask(COLMAP["qualifiante"], [True])
+    return engine.indices(selection)
+
+
+def payload_size(result):
+    """Octets sérialisés vers le navigateur (JSON de la figure, fichier exporté)"""
+    if isinstance(result, go.Figure):
+        return len(result.to_json())
+    if isinstance(result, bytes):
+        return len(result)
+    return None
+
+
+def measure(func, memory: bool = True) -> tuple:
+    """Temps d'une exécution, puis pic mémoire Python/numpy (tracemalloc) sur une seconde exécution"""
+    start = time.perf_counter()
+    result = func()
+    mesure = {"wall_s": round(time.perf_counter() - start, 4), "payload_bytes": payload_size(result)}
+    if memory:
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        mesure["peak_mb"] = round(peak / 2**20, 2)
+    return result, mesure
+
+
+def run(csv_path: Path, memory: bool) -> list:
+    results = []
+
+    def stage(nom, func, vue=None, cached=None):
+        if cached is not None:
+            # Fonction st.cache_data: cache vidé avant chaque exécution, on mesure le chemin à froid
+            func = lambda f=func: (cached.clear(), f())[1]  # noqa: E731
+        result, mesure = measure(func, memory)
+        results.append({"stage": nom, "vue": vue, **mesure})
+        return result
+
+    data = stage("load_data", lambda: load_data(str(csv_path)))
+    postal_df = stage("load_postal_codes", lambda: load_postal_codes(file_digest(POSTAL_CODES_PATH)),
+                      cached=load_postal_codes)
+    postal_index = stage("build_postal_index", lambda: build_postal_index(postal_df))
+    data = stage("enrich_with_geo_data", lambda: enrich_with_geo_data(data, postal_index))
+
+    engine = stage("filter_engine", lambda: FilterEngine(data, FILTER_COLUMNS))
+    rows = stage("filtres", lambda: filter_chain(engine))
+    index = stage("search_index", lambda: SearchIndex(data, SEARCH_FIELDS))
+    stage("recherche", lambda: index.search("informatique web", rows))
+    full_cube = stage("aggregate_cube", lambda: AggregateCube.from_frame(data, CUBE_COLUMNS))
+
+    contexte = {"data": data, "rows": rows, "cube": full_cube}
+    for vue, builders in VUES.items():
+        for nom, build in builders.items():
+            stage(nom, lambda build=build: build(contexte), vue=vue)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--output", type=Path, default=None, help="fichier JSON (défaut: sortie standard)")
+    parser.add_argument("--no-memory", action="store_true", help="ne mesurer que les temps")
+    args = parser.parse_args()
+
+    report = {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "plotly": plotly.__version__,
+        "runs": [],
+    }
+    source = load_source()
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            csv_path = synthetic_csv(source, n_rows, Path(tmp))
+            stages = run(csv_path, not args.no_memory)
+            # Pic RSS du processus (Ko sous Linux), y compris la mémoire Arrow des colonnes texte
+            max_rss_mb = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+            report["runs"].append({"rows": n_rows, "max_rss_mb": max_rss_mb, "stages": stages})
+            csv_path.unlink()
+
+    texte = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        args.output.write_text(texte, encoding="utf-8")
+    else:
+        print(texte)
+
+
+if __name__ == "__main__":
+    main()
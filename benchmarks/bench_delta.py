@@ -0,0 +1,132 @@
+"""Mise à jour des index par delta (DeltaPatch) comparée à leur reconstruction complète.
+
+Deux deltas successifs (modifications avec nouvelles valeurs, suppressions,
+nouveaux codes) sont appliqués à un cadastre synthétique. Moteur de filtres,
+index de recherche et cube dérivés du delta doivent être identiques à ceux
+reconstruits sur le jeu mis à jour; les catégories restent triées.
+
+Usage: python -m benchmarks.bench_delta [--sizes 10000 100000] [--delta-rows 500]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_dashboard import CUBE_COLUMNS, FILTER_COLUMNS, synthetic_csv
+from benchmarks.bench_ingestion import load_source
+from cadastre.aggregates import AggregateCube
+from cadastre.delta import DELTA_ACTION, DELTA_KEY, DELTA_SUPPRESSION, patch_delta
+from cadastre.files import file_digest
+from cadastre.filters import FilterEngine
+from cadastre.geo import POSTAL_CODES_PATH, build_postal_index, enrich_with_geo_data, load_postal_codes
+from cadastre.ingestion import load_data
+from cadastre.search import SEARCH_FIELDS, SearchIndex
+
+REQUETES = ["informatique", "gestion web", "nouvel", "secur", "aide soignant", "zz"]
+
+
+def synthetic_delta(data: pd.DataFrame, n_rows: int, seed: int) -> pd.DataFrame:
+    """Delta de n_rows lignes: un tiers de modifications, un tiers de suppressions, un tiers de nouveaux codes"""
+    rng = np.random.default_rng(seed)
+    tiers = n_rows // 3
+    lignes = data.iloc[rng.choice(len(data), size=n_rows, replace=False)].copy()
+    for col in ["type_organisme", "intitule"]:
+        lignes[col] = lignes[col].astype(object)
+    modifiees = lignes.iloc[:tiers].index
+    # Valeurs absentes du jeu, en tête et en fin d'ordre alphabétique
+    lignes.loc[modifiees, "type_organisme"] = np.where(np.arange(len(modifiees)) % 2, "AAA Organisme", "Zz Organisme")
+    lignes.loc[modifiees, "intitule"] = "Nouvel intitulé zzformation " + pd.Series(range(len(modifiees)), index=modifiees).astype(str)
+    lignes[DELTA_ACTION] = ""
+    lignes.loc[lignes.index[tiers:2 * tiers], DELTA_ACTION] = DELTA_SUPPRESSION
+    nouveaux = lignes.index[2 * tiers:]
+    lignes.loc[nouveaux, DELTA_KEY] = [f"nouveau-{seed}-{i}" for i in range(len(nouveaux))]
+    return lignes.reset_index(drop=True)
+
+
+def check_filters(patched: FilterEngine, rebuilt: FilterEngine) -> None:
+    # Levées explicites (comme np.testing): les vérifications tiennent aussi sous python -O
+    if patched.n_rows != rebuilt.n_rows:
+        raise AssertionError(f"{patched.n_rows} lignes au lieu de {rebuilt.n_rows}")
+    for col in FILTER_COLUMNS:
+        options = rebuilt.options(col)
+        if patched.options(col) != options or options != sorted(options):
+            raise AssertionError(f"options de {col}: {patched.options(col)} au lieu de {options}")
+        for value in options:
+            np.testing.assert_array_equal(patched.mask(col, [value]), rebuilt.mask(col, [value]))
+
+
+def check_search(patched: SearchIndex, rebuilt: SearchIndex, rows: np.ndarray) -> None:
+    for requete in REQUETES:
+        np.testing.assert_array_equal(patched.search(requete), rebuilt.search(requete))
+        np.testing.assert_array_equal(patched.search(requete, rows), rebuilt.search(requete, rows))
+
+
+def check_cube(patched: AggregateCube, rebuilt: AggregateCube) -> None:
+    def cellules(cube):
+        cells = cube.cells.astype({dim: str for dim in cube.dimensions})
+        return cells.sort_values(cube.dimensions).reset_index(drop=True)
+
+    attendu, obtenu = cellules(rebuilt), cellules(patched)
+    pd.testing.assert_frame_equal(obtenu[attendu.columns], attendu, check_dtype=False, atol=1e-3)
+
+
+def run(data: pd.DataFrame, delta_rows: int) -> dict:
+    mesures = {"patch": 0.0, "reconstruction": 0.0}
+    engine = FilterEngine(data, FILTER_COLUMNS)
+    index = SearchIndex(data, SEARCH_FIELDS)
+    cube = AggregateCube.from_frame(data, CUBE_COLUMNS)
+
+    # Deux deltas composés, comme au démarrage avec plusieurs deltas en attente
+    patch = None
+    for seed in (1, 2):
+        data, etape = patch_delta(data, synthetic_delta(data, delta_rows, seed))
+        patch = etape if patch is None else patch.then(etape)
+    for col in data.select_dtypes("category"):
+        categories = list(data[col].cat.categories)
+        if categories != sorted(categories):
+            raise AssertionError(f"catégories de {col} non triées")
+
+    start = time.perf_counter()
+    engine_p = engine.patched(patch, data)
+    index_p = index.patched(patch, data, SEARCH_FIELDS)
+    cube_p = cube.patched(patch, data, CUBE_COLUMNS)
+    mesures["patch"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    engine_r = FilterEngine(data, FILTER_COLUMNS)
+    index_r = SearchIndex(data, SEARCH_FIELDS)
+    cube_r = AggregateCube.from_frame(data, CUBE_COLUMNS)
+    mesures["reconstruction"] = time.perf_counter() - start
+
+    check_filters(engine_p, engine_r)
+    check_search(index_p, index_r, np.arange(0, len(data), 3))
+    check_cube(cube_p, cube_r)
+    return mesures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--delta-rows", type=int, default=500)
+    args = parser.parse_args()
+
+    source = load_source()
+    postal_index = build_postal_index(load_postal_codes(file_digest(POSTAL_CODES_PATH)))
+    print(f"{'lignes':>10} {'delta':>7} {'patch (s)':>10} {'reconstruction (s)':>19} {'gain':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_rows in args.sizes:
+            csv_path = synthetic_csv(source, n_rows, Path(tmp))
+            data = enrich_with_geo_data(load_data(str(csv_path)), postal_index)
+            try:
+                m = run(data, args.delta_rows)
+            except AssertionError as e:
+                raise SystemExit(f"Index dérivés du delta différents de la reconstruction ({n_rows} lignes): {e}")
+            print(f"{n_rows:>10} {2 * args.delta_rows:>7} {m['patch']:>10.3f} {m['reconstruction']:>19.3f} "
+                  f"{m['reconstruction'] / m['patch']:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Vérifie parse_durees contre le fichier de référence et mesure son débit.
+
+Usage: python -m benchmarks.bench_duree [--rows 100000]
+       python benchmarks/bench_duree.py (code de sortie 1 si une durée diffère de la référence)
+"""
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ""):
+    # Exécution directe (python benchmarks/...py): la racine du dépôt rend benchmarks et cadastre importables
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.bench_ingestion import load_source, resample
+from cadastre.ingestion import _heures, parse_duree, parse_durees
+
+GOLDEN = Path(__file__).resolve().parent / "golden" / "durees.csv"
+
+
+def parse_duree_legacy(duree_str):
+    """Implémentation historique: unité devinée par sous-chaîne ('an' in 'plan' -> années)"""
+    if pd.isna(duree_str):
+        return None
+    duree = str(duree_str).lower()
+    numbers = re.findall(r'\d+', duree)
+    if not numbers:
+        return None
+    nb = int(numbers[0])
+    if 'année' in duree or 'an' in duree:
+        return nb * 1000
+    elif 'mois' in duree:
+        return nb * 120
+    elif 'semaine' in duree:
+        return nb * 35
+    elif 'jour' in duree or 'journée' in duree:
+        return nb * 7
+    return nb
+
+
+def check_golden(path: str = GOLDEN) -> int:
+    """parse_durees doit reproduire exactement les heures du fichier de référence"""
+    golden = pd.read_csv(path, sep=';', dtype=str, keep_default_na=False, encoding='utf-8')
+    expected = pd.to_numeric(golden['duree_h'], errors='coerce').to_numpy()
+    result = parse_durees(golden['duree']).to_numpy(dtype=float)
+    ecarts = ~np.isclose(result, expected, equal_nan=True)
+    if ecarts.any():
+        # Levée explicite: la vérification tient aussi sous python -O
+        raise AssertionError(f"durées différentes de {path}:\n{golden[ecarts].assign(obtenu=result[ecarts])}")
+    return len(golden)
+
+
+def rate(func, values) -> float:
+    _heures.cache_clear()
+    start = time.perf_counter()
+    func(values)
+    return len(values) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    try:
+        print(f"{check_golden()} cas de référence OK")
+    except AssertionError as e:
+        raise SystemExit(str(e))
+
+    durees = resample(load_source(), args.rows)['duree']
+    resultats = [
+        ("parse_duree historique (apply)", lambda s: s.apply(parse_duree_legacy)),
+        ("grammaire ligne par ligne (apply)", lambda s: s.apply(parse_duree)),
+        ("grammaire par valeur distincte", parse_durees),
+    ]
+    print(f"{args.rows} durées ({durees.nunique()} distinctes)")
+    for nom, func in resultats:
+        print(f"{nom:<40} {rate(func, durees):>14,.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare l'ancienne dérivation ligne par ligne (apply) à derive_columns.
+
+Usage: python -m benchmarks.bench_ingestion [--sizes 10000 100000 1000000]
+       python benchmarks/bench_ingestion.py (code de sortie 1 si la parité est rompue)
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+if __package__ in (None, ""):
+    # Exécution directe (python benchmarks/...py): la racine du dépôt rend benchmarks et cadastre importables
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from cadastre.ingestion import PROVINCES_WALLONNES, _motifs_province, derive_columns
+
+SOURCE = "data/formations_clean.csv"
+
+
+def derive_columns_rowwise(df: pd.DataFrame) -> pd.DataFrame:
+    """Implémentation historique de load_data, conservée comme référence"""
+    # Copies historiques de bench_province/bench_duree, et non les versions actuelles de
+    # cadastre.ingestion. Import local: ces modules importent celui-ci.
+    from benchmarks.bench_duree import parse_duree_legacy
+    from benchmarks.bench_province import extract_province_legacy
+
+    # Boucle historique étendue à toutes les communes: même périmètre que le ProvinceMatcher
+    villes = {nom: province for nom, province, _ in _motifs_province() if nom not in PROVINCES_WALLONNES}
+    df['province'] = df['localisation_potentielle'].apply(extract_province_legacy, villes=villes)
+    df['duree_h'] = df['duree'].apply(parse_duree_legacy)
+    df['categorie_duree'] = df.apply(lambda x:
+        'Courte' if x.get('courte') == 'OUI'
+        else 'Moyenne' if x.get('moyenne') == 'OUI'
+        else 'Longue' if x.get('longue') == 'OUI'
+        else 'Non spécifié', axis=1)
+    return df
+
+
+def check_parity(result: pd.DataFrame, expected: pd.DataFrame) -> int:
+    """Parité avec l'implémentation historique; renvoie le nombre de durées corrigées.
+
+    Les seuls écarts admis sont les durées que la grammaire corrige (unité mal
+    devinée par l'ancien code), chacune devant figurer dans le fichier de référence.
+    """
+    from benchmarks.bench_duree import GOLDEN
+
+    golden = pd.read_csv(GOLDEN, sep=';', dtype=str, keep_default_na=False, encoding='utf-8')
+    golden = pd.to_numeric(golden.set_index('duree')['duree_h'], errors='coerce')
+    obtenu = result['duree_h'].to_numpy(dtype=float)
+    ecarts = ~np.isclose(obtenu, expected['duree_h'].to_numpy(dtype=float), equal_nan=True)
+    corrigees = result.loc[ecarts, 'duree']
+    # Levées explicites: la vérification tient aussi sous python -O
+    inconnues = corrigees[~corrigees.isin(golden.index)].unique()
+    if len(inconnues):
+        raise AssertionError(f"durées différentes de l'implémentation historique, absentes de {GOLDEN}: {list(inconnues)}")
+    np.testing.assert_allclose(obtenu[ecarts], golden[corrigees].to_numpy(dtype=float))
+    pd.testing.assert_frame_equal(result.drop(columns='duree_h'), expected.drop(columns='duree_h'))
+    return int(ecarts.sum())
+
+
+def load_source(path: str = SOURCE) -> pd.DataFrame:
+    df = pd.read_csv(path, sep=';', encoding='utf-8')
+    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+
+def resample(df: pd.DataFrame, n_rows: int) -> pd.DataFrame:
+    """Cadastre synthétique de n_rows lignes tirées du fichier réel"""
+    return df.sample(n=n_rows, replace=True, random_state=0).reset_index(drop=True)
+
+
+def timed(func, df):
+    start = time.perf_counter()
+    result = func(df.copy())
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    source = load_source()
+    print(f"{'lignes':>10} {'apply (s)':>12} {'vectorisé (s)':>14} {'gain':>8} {'durées corrigées':>17}")
+    for n_rows in args.sizes:
+        df = resample(source, n_rows)
+        expected, t_rowwise = timed(derive_columns_rowwise, df)
+        result, t_vector = timed(derive_columns, df)
+        try:
+            corrigees = check_parity(result, expected)
+        except AssertionError as e:
+            raise SystemExit(f"Parité rompue sur {n_rows} lignes: {e}")
+        print(f"{n_rows:>10} {t_rowwise:>12.3f} {t_vector:>14.3f} {t_rowwise / t_vector:>7.1f}x {corrigees:>17}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,32 @@
+"""Rapport mémoire par colonne: chaînes brutes de read_csv vs schéma typé.
+
+Usage: python -m benchmarks.bench_memory [--rows 100000]
+"""
+import argparse
+
+import pandas as pd
+
+from benchmarks.bench_ingestion import load_source, resample
+from cadastre.ingestion import derive_columns
+from cadastre.schema import apply_schema, memory_report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=None, help="rééchantillonner à n lignes")
+    args = parser.parse_args()
+
+    source = load_source()
+    if args.rows:
+        source = resample(source, args.rows)
+    before = derive_columns(source)
+    after = apply_schema(before.copy())
+
+    report = memory_report(before, after)
+    with pd.option_context("display.max_rows", None, "display.width", 120):
+        print(f"{len(before)} lignes")
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
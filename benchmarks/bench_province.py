@@ -0,0 +1,74 @@
+"""Débit du ProvinceMatcher face à la boucle historique d'extract_province.
+
+Usage: python -m benchmarks.bench_province [--rows 100000]
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from benchmarks.bench_ingestion import load_source, resample
+from cadastre.ingestion import (PROVINCES_WALLONNES, VILLES_PROVINCES, _motifs_province,
+                                extract_province, extract_province_vectorized)
+from cadastre.matching import ProvinceMatcher
+
+
+def extract_province_legacy(localisation, villes=VILLES_PROVINCES):
+    """Boucle historique: une recherche de sous-chaîne par motif et par ligne"""
+    if pd.isna(localisation) or str(localisation).strip() == "":
+        return "Non spécifié"
+
+    loc = str(localisation).strip()
+    for ville, province in villes.items():
+        if ville.lower() in loc.lower():
+            return province
+
+    for province in PROVINCES_WALLONNES.keys():
+        if province.lower() in loc.lower():
+            return province
+
+    return "Non spécifié"
+
+
+def check_parity(localisations: pd.Series) -> None:
+    """Sur les motifs historiques, l'automate doit reproduire la boucle à l'identique"""
+    motifs = [(v, p, False) for v, p in VILLES_PROVINCES.items()]
+    motifs += [(p, p, False) for p in PROVINCES_WALLONNES]
+    matcher = ProvinceMatcher(motifs)
+    extras = pd.Series([None, "", "  ", "Namur et Liège", "Liège / Namur", "Province du Hainaut", "Brabant Wallon"])
+    for loc in pd.concat([localisations, extras]):
+        if matcher.match(loc) != extract_province_legacy(loc):
+            # Levée explicite: la vérification tient aussi sous python -O
+            raise AssertionError(f"{loc!r}: {matcher.match(loc)} au lieu de {extract_province_legacy(loc)}")
+
+
+def rate(func, values) -> float:
+    start = time.perf_counter()
+    func(values)
+    return len(values) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    localisations = resample(load_source(), args.rows)['localisation_potentielle']
+    check_parity(localisations.drop_duplicates())
+
+    # Boucle historique étendue à toutes les communes, pour comparer à périmètre égal
+    toutes_villes = {nom: province for nom, province, _ in _motifs_province() if nom not in PROVINCES_WALLONNES}
+    resultats = [
+        ("boucle historique (17 villes)", lambda s: s.apply(extract_province_legacy)),
+        (f"boucle historique ({len(toutes_villes)} motifs)",
+         lambda s: s.apply(extract_province_legacy, villes=toutes_villes)),
+        ("ProvinceMatcher ligne par ligne", lambda s: s.apply(extract_province)),
+        ("ProvinceMatcher par valeur distincte", extract_province_vectorized),
+    ]
+    print(f"{args.rows} localisations ({localisations.nunique()} distinctes)")
+    for nom, func in resultats:
+        print(f"{nom:<40} {rate(func, localisations):>14,.0f} lignes/s")
+
+
+if __name__ == "__main__":
+    main()
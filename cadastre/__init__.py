@@ -0,0 +1 @@
+"""Pipeline de données du cadastre des formations TIC en Wallonie."""
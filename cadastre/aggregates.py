@@ -0,0 +1,167 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cadastre.delta import incremental_build
+from cadastre.instrumentation import cache_miss
+
+# Dimensions logiques du cube; les colonnes réelles viennent du colmap de l'app
+CUBE_DIMENSIONS = ("province", "arrondissement", "ville", "organisme", "categorie_duree", "qualifiante", "certifiante")
+
+
+class AggregateCube:
+    """Cube de comptages précalculé sur les dimensions catégorielles du cadastre.
+
+    Chaque cellule porte le nombre de formations et, si les coordonnées sont
+    disponibles, les sommes de latitude/longitude permettant de recalculer des
+    centroïdes. Les graphiques interrogent des tranches du cube au lieu de
+    reparcourir les lignes.
+    """
+
+    def __init__(self, cells: pd.DataFrame, dimensions: list):
+        self.cells = cells
+        self.dimensions = dimensions
+        # Hiérarchies déjà calculées sur ce cube (le cube complet est partagé entre sessions)
+        self._hierarchies = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: dict, rows=None) -> "AggregateCube":
+        """Construit le cube depuis les lignes (columns: dimension logique -> colonne).
+
+        rows: positions des lignes à compter; seules les colonnes du cube en sont extraites.
+        """
+        def colonne(col):
+            return df[col] if rows is None else df[col].iloc[rows]
+
+        dims = {name: col for name, col in columns.items() if col and col in df.columns}
+        frame = pd.DataFrame({name: colonne(col) for name, col in dims.items()},
+                             index=df.index if rows is None else df.index[rows])
+        frame['count'] = 1
+        if 'latitude' in df.columns and 'longitude' in df.columns:
+            latitude, longitude = colonne('latitude'), colonne('longitude')
+            geo = latitude.notna() & longitude.notna()
+            frame['geo_count'] = geo.astype(int)
+            frame['lat_sum'] = latitude.where(geo, 0.0)
+            frame['lon_sum'] = longitude.where(geo, 0.0)
+        if not dims:
+            return cls(frame.sum().to_frame().T, [])
+        cells = frame.groupby(list(dims), dropna=False, observed=True, sort=False).sum().reset_index()
+        # Les cellules sont peu nombreuses: valeurs simples plutôt que catégories figées
+        for name in dims:
+            if isinstance(cells[name].dtype, pd.CategoricalDtype):
+                cells[name] = cells[name].astype(object)
+        return cls(cells, list(dims))
+
+    def patched(self, patch, df: pd.DataFrame, columns: dict) -> "AggregateCube":
+        """Cube du jeu mis à jour: cellules des lignes retirées soustraites, celles des lignes ajoutées sommées"""
+        if not self.dimensions:
+            return AggregateCube.from_frame(df, columns)
+        retraits = AggregateCube.from_frame(patch.removed, columns).cells
+        measures = [m for m in retraits.columns if m not in self.dimensions]
+        retraits[measures] = -retraits[measures]
+        ajouts = AggregateCube.from_frame(df.iloc[patch.added], columns).cells
+        cells = pd.concat([self.cells, ajouts, retraits], ignore_index=True)
+        cells = cells.groupby(self.dimensions, dropna=False, sort=False).sum().reset_index()
+        return AggregateCube(cells[cells['count'] != 0].reset_index(drop=True), self.dimensions)
+
+    def has(self, dim) -> bool:
+        return dim in self.dimensions
+
+    def slice(self, selections: dict) -> "AggregateCube":
+        """Sous-cube des cellules dont chaque dimension sélectionnée vaut l'une des valeurs"""
+        active = {dim: values for dim, values in selections.items() if values and self.has(dim)}
+        if not active:
+            # Aucun filtre: le cube lui-même, avec ses résultats déjà calculés
+            return self
+        keep = np.ones(len(self.cells), dtype=bool)
+        for dim, values in active.items():
+            keep &= self.cells[dim].isin(values).to_numpy()
+        return AggregateCube(self.cells[keep], self.dimensions)
+
+    def total(self, **selections) -> int:
+        cube = self.slice(selections) if selections else self
+        return int(cube.cells['count'].sum())
+
+    def nunique(self, dim) -> int:
+        """Nombre de valeurs distinctes (hors manquantes) présentes dans le cube"""
+        return int(self.cells[dim].dropna().nunique()) if self.has(dim) else 0
+
+    def counts(self, *dims) -> pd.DataFrame:
+        """Comptages par combinaison des dimensions, triés par effectif décroissant"""
+        counts = self.cells.groupby(list(dims), observed=True)['count'].sum().reset_index()
+        return counts.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+    def hierarchy(self, *dims, threshold: int = 0, exclude=()) -> pd.DataFrame:
+        """Nœuds de la hiérarchie dims (voir hierarchy_nodes), calculés une fois par cube.
+
+        exclude: valeurs de la première dimension retirées de la hiérarchie.
+        """
+        key = (dims, threshold, tuple(exclude))
+        if key not in self._hierarchies:
+            counts = self.counts(*dims)
+            counts = counts[~counts[dims[0]].isin(exclude)]
+            self._hierarchies[key] = hierarchy_nodes(counts, list(dims), threshold)
+        return self._hierarchies[key]
+
+    def centroids(self, dim, attributes=()) -> pd.DataFrame:
+        """Comptage, coordonnées moyennes et valeur dominante des attributs par valeur de dim"""
+        measures = [m for m in ('count', 'geo_count', 'lat_sum', 'lon_sum') if m in self.cells.columns]
+        result = self.cells.groupby(dim, observed=True)[measures].sum()
+        if 'geo_count' in result.columns:
+            geo_count = result['geo_count'].where(result['geo_count'] > 0)
+            result['latitude'] = result['lat_sum'] / geo_count
+            result['longitude'] = result['lon_sum'] / geo_count
+        for attribute in attributes:
+            if self.has(attribute):
+                dominant = self.counts(dim, attribute).drop_duplicates(dim).set_index(dim)[attribute]
+                result[attribute] = dominant
+        result = result.drop(columns=[m for m in measures if m != 'count']).reset_index()
+        return result.sort_values('count', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def hierarchy_nodes(counts: pd.DataFrame, levels: list, threshold: int = 0) -> pd.DataFrame:
+    """Tableaux id/label/parent/count d'un sunburst ou treemap depuis des comptages par feuille.
+
+    Les feuilles de threshold formations ou moins sont retirées; chaque nœud
+    parent vaut la somme des feuilles conservées (branchvalues='total').
+    Les ids suivent le format de plotly.express: valeurs du chemin jointes par '/'.
+    """
+    leaves = counts[counts['count'] > threshold]
+    nodes = []
+    for depth in range(1, len(levels) + 1):
+        keys = levels[:depth]
+        level = leaves.groupby(keys, observed=True, sort=False)['count'].sum().reset_index()
+        path = [level[key].astype(str) for key in keys]
+        parent = path[0] if depth > 1 else pd.Series("", index=level.index)
+        for part in path[1:-1]:
+            parent = parent + "/" + part
+        nodes.append(pd.DataFrame({
+            'id': parent + "/" + path[-1] if depth > 1 else path[-1],
+            'label': path[-1],
+            'parent': parent,
+            'count': level['count'],
+        }))
+    return pd.concat(nodes, ignore_index=True)
+
+
+@st.cache_resource(max_entries=8)
+def build_aggregate_cube(dataset_key: str, _df: pd.DataFrame, columns: tuple) -> AggregateCube:
+    """Cube complet construit une fois par jeu de données (identifié par sa clé).
+
+    Un jeu issu d'un delta reprend le cube de la version précédente.
+    """
+    cache_miss()
+    return incremental_build(("cube", columns), dataset_key, _df,
+                             build=lambda df: AggregateCube.from_frame(df, dict(columns)),
+                             patch=lambda cube, delta_patch, df: cube.patched(delta_patch, df, dict(columns)))
+
+
+@st.cache_resource(max_entries=32)
+def build_selection_cube(filter_state: str, _df: pd.DataFrame, _rows, columns: tuple) -> AggregateCube:
+    """Cube des lignes trouvées par une recherche, construit une fois par état des filtres.
+
+    filter_state (filter_key: jeu, filtres, requête) détermine les lignes: les
+    reruns sans rapport avec la recherche (pagination, cartes) le réutilisent.
+    """
+    cache_miss()
+    return AggregateCube.from_frame(_df, dict(columns), _rows)
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+import streamlit as st
+
+# Vérifications bcrypt simultanées (au-delà, les connexions attendent leur tour)
+AUTH_WORKERS = int(os.environ.get("CADASTRE_AUTH_WORKERS", "4"))
+# Échecs tolérés par compte sur la fenêtre glissante, avant refus sans vérification
+LOGIN_MAX_ATTEMPTS = int(os.environ.get("CADASTRE_LOGIN_MAX_ATTEMPTS", "5"))
+LOGIN_WINDOW = int(os.environ.get("CADASTRE_LOGIN_WINDOW", "300"))
+# Durée de validité maximale d'un jeton de reconnexion (secondes)
+SESSION_TTL = int(os.environ.get("CADASTRE_SESSION_TTL", str(12 * 3600)))
+
+
+class TooManyAttempts(Exception):
+    """Trop d'échecs récents pour ce compte"""
+
+
+class Authenticator:
+    """Vérification des mots de passe et jetons de reconnexion, partagés par toutes les sessions.
+
+    bcrypt s'exécute dans un pool borné: une vague de connexions n'occupe pas
+    plus de AUTH_WORKERS cœurs. Après une connexion réussie, un jeton aléatoire
+    permet à un navigateur qui se reconnecte de rétablir sa session sans
+    refaire bcrypt. Les jetons n'ont de sens que pour ce processus (registre
+    en mémoire, seule leur empreinte y est gardée); chacun ne sert qu'une fois,
+    pour le client (IP, navigateur) qui l'a reçu, et est révoqué à la
+    déconnexion ou si le mot de passe du compte change.
+    """
+
+    def __init__(self, workers: int = AUTH_WORKERS, max_attempts: int = LOGIN_MAX_ATTEMPTS,
+                 window: int = LOGIN_WINDOW, ttl: int = SESSION_TTL):
+        self.max_attempts = max_attempts
+        self.window = window
+        self.ttl = ttl
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.failures = {}
+        self.pending = {}  # vérifications en cours par compte, comptées comme des échecs potentiels
+        self.tokens = {}  # empreinte du jeton -> (utilisateur, expiration, empreinte du hash, client)
+        self.lock = threading.Lock()
+
+    def verify(self, username: str, password: str, stored_hash) -> bool:
+        """Vérifie le mot de passe (stored_hash None: compte inconnu); TooManyAttempts si bloqué"""
+        # Contrôle et réservation de la tentative dans la même section critique: des tentatives
+        # simultanées ne dépassent pas max_attempts vérifications sur la fenêtre
+        with self.lock:
+            self._prune()
+            if self._attempts(username) >= self.max_attempts:
+                raise TooManyAttempts(username)
+            self.pending[username] = self.pending.get(username, 0) + 1
+        ok = False
+        try:
+            ok = stored_hash is not None and self.pool.submit(
+                bcrypt.checkpw, password.encode('utf-8'), stored_hash.encode('utf-8')).result()
+        finally:
+            with self.lock:
+                self.pending[username] -= 1
+                if not self.pending[username]:
+                    del self.pending[username]
+                if ok:
+                    self.failures.pop(username, None)
+                else:
+                    self.failures.setdefault(username, deque()).append(time.monotonic())
+        return ok
+
+    def blocked(self, username: str) -> bool:
+        with self.lock:
+            self._prune()
+            return self._attempts(username) >= self.max_attempts
+
+    def _attempts(self, username: str) -> int:
+        return len(self.failures.get(username, ())) + self.pending.get(username, 0)
+
+    def _prune(self) -> None:
+        limite = time.monotonic() - self.window
+        for username in list(self.failures):
+            echecs = self.failures[username]
+            while echecs and echecs[0] < limite:
+                echecs.popleft()
+            if not echecs:
+                del self.failures[username]
+
+    def issue(self, username: str, stored_hash: str, client: str = "") -> str:
+        """Nouveau jeton de reconnexion, valable ttl secondes pour ce client"""
+        token = secrets.token_urlsafe(32)
+        now = time.time()
+        with self.lock:
+            # Jetons expirés oubliés au fil des émissions: le registre reste borné
+            for key in [k for k, entry in self.tokens.items() if entry[1] < now]:
+                del self.tokens[key]
+            self.tokens[_digest(token)] = (username, now + self.ttl, _digest(stored_hash), _digest(client))
+        return token
+
+    def check(self, token: str, stored_hash, client: str = ""):
+        """Nom d'utilisateur si le jeton est valide (stored_hash: username -> hash ou None).
+
+        Le jeton n'est consommé que présenté par son client: un autre client qui
+        l'aurait vu (lien partagé, historique) ne peut pas l'invalider. L'appelant
+        en émet un nouveau pour la session rétablie.
+        """
+        key = _digest(token)
+        with self.lock:
+            entry = self.tokens.get(key)
+        if entry is None or _digest(client) != entry[3]:
+            return None
+        username, expires, hash_digest, _ = entry
+        current = stored_hash(username)
+        if expires < time.time() or current is None or _digest(current) != hash_digest:
+            # Jeton expiré, ou mot de passe changé depuis l'émission: il ne servira plus
+            self.revoke(token)
+            return None
+        with self.lock:
+            # Consommation atomique: de deux reconnexions simultanées, une seule aboutit
+            if self.tokens.pop(key, None) is None:
+                return None
+        return username
+
+    def revoke(self, token: str) -> None:
+        """Invalide le jeton (déconnexion)"""
+        with self.lock:
+            self.tokens.pop(_digest(token), None)
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+@st.cache_resource
+def authenticator() -> Authenticator:
+    """Instance partagée par le processus (un redémarrage invalide les jetons de reconnexion)"""
+    return Authenticator()
@@ -0,0 +1,400 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+import pandas as pd
+import streamlit as st
+
+from cadastre.delta import apply_delta, patch_delta, read_delta, record_version
+from cadastre.files import file_digest
+from cadastre.geo import POSTAL_CODES_PATH, enrich_with_geo_data, load_postal_index
+from cadastre.ingestion import load_data
+from cadastre.instrumentation import cache_miss, sub_stage
+
+logger = logging.getLogger(__name__)
+
+# À incrémenter dès que load_data ou enrich_with_geo_data produisent un résultat différent
+PIPELINE_VERSION = "5"
+
+CACHE_DIR = Path(os.environ.get("CADASTRE_CACHE_DIR", ".cache/cadastre"))
+# Jeux importés gardés en mémoire (partagés entre sessions, dédoublonnés par contenu)
+UPLOAD_MAX_ENTRIES = int(os.environ.get("CADASTRE_UPLOAD_MAX_ENTRIES", "4"))
+UPLOAD_MAX_BYTES = int(os.environ.get("CADASTRE_UPLOAD_MAX_MB", "512")) * 2**20
+UPLOAD_TTL = int(os.environ.get("CADASTRE_UPLOAD_TTL", "3600"))
+# Figures sérialisées partagées entre sessions (JSON Plotly)
+FIGURE_CACHE_MAX_BYTES = int(os.environ.get("CADASTRE_FIGURE_CACHE_MB", "64")) * 2**20
+# Deltas quotidiens (CSV, même schéma que le cadastre), appliqués dans l'ordre des noms de fichiers
+DELTAS_DIR = Path(os.environ.get("CADASTRE_DELTAS_DIR", "data/deltas"))
+# Deltas journalisés au-delà desquels le jeu complet est réécrit comme nouvelle base
+DELTA_JOURNAL_MAX = int(os.environ.get("CADASTRE_DELTA_JOURNAL_MAX", "20"))
+
+
+def dataset_key(path: str, postal_path: str = POSTAL_CODES_PATH) -> str:
+    """Clé du jeu enrichi: formations + codes postaux + version du pipeline"""
+    return _key(file_digest(path), file_digest(postal_path))
+
+
+def upload_key(digest: str, postal_digest: str) -> str:
+    """Clé d'un jeu importé: mêmes composantes que dataset_key, empreinte du contenu importé en tête"""
+    return f"upload-{_key(digest, postal_digest)}"
+
+
+def _key(source_digest: str, postal_digest: str) -> str:
+    parts = [source_digest, postal_digest, PIPELINE_VERSION]
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+
+def delta_files(deltas_dir: Path = DELTAS_DIR) -> list:
+    return sorted(Path(deltas_dir).glob("*.csv"))
+
+
+def dataset_keys(path: str, postal_path: str = POSTAL_CODES_PATH, deltas=()) -> list:
+    """Clés successives du jeu enrichi: base, puis après chacun des deltas"""
+    keys = [dataset_key(path, postal_path)]
+    for delta in deltas:
+        keys.append(hashlib.sha256(f"{keys[-1]}|{file_digest(delta)}".encode()).hexdigest()[:16])
+    return keys
+
+
+def load_enriched_dataset(path: str, postal_path: str = POSTAL_CODES_PATH,
+                          deltas_dir: Path = DELTAS_DIR) -> pd.DataFrame:
+    """Charge le jeu enrichi depuis le cache disque, en n'appliquant que les deltas nouveaux.
+
+    Le DataFrame renvoyé est partagé par toutes les sessions du processus: il
+    ne doit pas être modifié (les vues filtrées passent par data.iloc[rows],
+    que le copy-on-write de pandas isole du jeu partagé).
+    """
+    deltas = delta_files(deltas_dir)
+    keys = dataset_keys(path, postal_path, deltas)
+    return _load_enriched_dataset(tuple(keys), path, tuple(str(d) for d in deltas), file_digest(postal_path))
+
+
+def load_uploaded_dataset(uploaded) -> pd.DataFrame:
+    """Jeu enrichi d'un CSV importé; deux imports du même contenu partagent le même objet"""
+    cache = upload_cache()
+    # Un changement des codes postaux ou du pipeline donne une nouvelle clé: jeu, index et figures
+    # construits avec l'ancien enrichissement ne sont plus servis
+    postal_digest = file_digest(POSTAL_CODES_PATH)
+    key = upload_key(cache.digest(uploaded), postal_digest)
+    return cache.get_or_load(key, lambda: _load_uploaded_dataset(key, uploaded, postal_digest))
+
+
+class UploadCache:
+    """Cache LRU des jeux importés, indexé par empreinte du contenu.
+
+    Borné en nombre d'entrées et en octets (mémoire profonde des DataFrames);
+    les entrées inutilisées depuis ttl secondes sont libérées. Un même contenu
+    n'est chargé qu'une fois à la fois: les sessions qui le demandent pendant
+    son chargement en attendent le résultat. Les compteurs hits/misses/evictions
+    alimentent le panneau d'instrumentation.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int, ttl: float = None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()  # empreinte -> (data, octets, dernier accès)
+        self._digests = OrderedDict()  # file_id -> empreinte
+        self._loading = {}  # empreinte -> Future du chargement en cours
+        self._lock = threading.Lock()
+
+    def digest(self, uploaded) -> str:
+        """Empreinte du contenu, calculée une fois par fichier importé (les reruns la réutilisent)"""
+        file_id = getattr(uploaded, "file_id", None)
+        with self._lock:
+            if file_id is not None and file_id in self._digests:
+                return self._digests[file_id]
+        digest = hashlib.sha256(uploaded.getvalue()).hexdigest()[:16]
+        if file_id is not None:
+            with self._lock:
+                self._digests[file_id] = digest
+                while len(self._digests) > 256:
+                    self._digests.popitem(last=False)
+        return digest
+
+    def get_or_load(self, digest: str, load) -> pd.DataFrame:
+        with self._lock:
+            self._evict()
+            entry = self._entries.get(digest)
+            if entry is not None:
+                # Le délai d'expiration repart à chaque accès
+                self._entries[digest] = (entry[0], entry[1], time.monotonic())
+                self._entries.move_to_end(digest)
+                self.hits += 1
+                return entry[0]
+            pending = self._loading.get(digest)
+            if pending is None:
+                pending = self._loading[digest] = Future()
+                self.misses += 1
+                owner = True
+            else:
+                self.hits += 1
+                owner = False
+
+        if not owner:
+            # Même contenu en cours de chargement par une autre session: son résultat (ou son erreur)
+            return pending.result()
+
+        # Chargement hors verrou: les autres sessions continuent d'être servies
+        try:
+            data = load()
+        except BaseException as e:
+            with self._lock:
+                del self._loading[digest]
+            pending.set_exception(e)
+            raise
+        nbytes = int(data.memory_usage(deep=True).sum())
+        with self._lock:
+            del self._loading[digest]
+            self._entries[digest] = (data, nbytes, time.monotonic())
+            self._evict()
+        pending.set_result(data)
+        return data
+
+    @property
+    def nbytes(self) -> int:
+        return sum(entry[1] for entry in self._entries.values())
+
+    def _evict(self) -> None:
+        # Entrées inutilisées depuis ttl secondes: libérées sans attendre qu'on les redemande
+        if self.ttl is not None:
+            limite = time.monotonic() - self.ttl
+            for digest in [d for d, (_, _, acces) in self._entries.items() if acces < limite]:
+                _, nbytes, _ = self._entries.pop(digest)
+                self.evictions += 1
+                logger.info("Import %s expiré (%.1f Mo)", digest, nbytes / 2**20)
+        # L'entrée la plus récente est toujours conservée, même seule au-delà de max_bytes
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self.nbytes > self.max_bytes):
+            digest, (_, nbytes, _) = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info("Import %s évincé du cache (%.1f Mo)", digest, nbytes / 2**20)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requetes = self.hits + self.misses
+            return {
+                "entrées": len(self._entries),
+                "Mo": round(self.nbytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux de hit": round(self.hits / requetes, 3) if requetes else None,
+                "évictions": self.evictions,
+            }
+
+
+@st.cache_resource
+def upload_cache() -> UploadCache:
+    """Cache des imports, unique pour le processus"""
+    return UploadCache(UPLOAD_MAX_ENTRIES, UPLOAD_MAX_BYTES, UPLOAD_TTL)
+
+
+def filter_key(dataset_key: str, selections: dict, query: str = "") -> str:
+    """Empreinte canonique des filtres actifs: l'ordre des filtres et des valeurs choisies est sans effet"""
+    canonical = {
+        "dataset": dataset_key,
+        "selections": {dim: sorted(values, key=str) for dim, values in selections.items() if values},
+        "q": query or "",
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+class FigureCache:
+    """Cache LRU des figures sérialisées (JSON), partagé par toutes les sessions.
+
+    Indexé par (empreinte des filtres, nom de figure); borné en octets de JSON.
+    Une chaîne est immuable: une session ne peut pas modifier la figure
+    affichée par une autre.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()  # (filtres, nom) -> JSON ou None (pas de figure)
+        self._lock = threading.Lock()
+
+    def get_or_build(self, key: tuple, build):
+        """(JSON de la figure ou None, True si servi par le cache)"""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key], True
+            self.misses += 1
+
+        # Construction hors verrou: les autres sessions continuent d'être servies
+        fig = build()
+        spec = fig.to_json() if fig is not None else None
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = spec
+                self.nbytes += len(spec or "")
+                self._evict()
+        return spec, False
+
+    def _evict(self) -> None:
+        while len(self._entries) > 1 and self.nbytes > self.max_bytes:
+            _, spec = self._entries.popitem(last=False)
+            self.nbytes -= len(spec or "")
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            requetes = self.hits + self.misses
+            return {
+                "entrées": len(self._entries),
+                "Mo": round(self.nbytes / 2**20, 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "taux de hit": round(self.hits / requetes, 3) if requetes else None,
+                "évictions": self.evictions,
+            }
+
+
+@st.cache_resource
+def figure_cache() -> FigureCache:
+    """Cache des figures, unique pour le processus"""
+    return FigureCache(FIGURE_CACHE_MAX_BYTES)
+
+
+# Dernière version servie par le processus: point de départ des deltas suivants
+_latest = None
+
+
+# Une version par clé; la précédente est libérée dès qu'un delta arrive
+@st.cache_resource(max_entries=2)
+def _load_enriched_dataset(keys: tuple, path: str, deltas: tuple, postal_digest: str) -> pd.DataFrame:
+    global _latest
+    cache_miss()
+    # keys[n] = base + n premiers deltas. La version précédente encore en mémoire évite
+    # toute relecture, et ses index (filtres, recherche, cube) sont dérivés du delta.
+    if _latest is not None and _latest[0] in keys:
+        depart = appliques = keys.index(_latest[0])
+        data = _latest[1]
+    else:
+        depart = None
+        data, appliques = _read_cached_chain(keys)
+        if data is None:
+            data = _load_and_enrich(path, postal_digest)
+            _write_cache(data, _cache_file(keys[0]))
+
+    # Seules les lignes des deltas sont dérivées; le reste du jeu est repris tel quel.
+    # Le cache disque ne reçoit que ces lignes (journal), sans réécrire le jeu complet.
+    patch = None
+    for n in range(appliques + 1, len(keys)):
+        delta_path = deltas[n - 1]
+        with sub_stage(f"delta {Path(delta_path).name}"):
+            delta = read_delta(delta_path, postal_digest)
+            data, etape = patch_delta(data, delta)
+        _write_parquet(delta, _journal_file(keys[n]))
+        patch = etape if patch is None else patch.then(etape)
+        logger.info("Delta %s appliqué (%d lignes)", delta_path, len(data))
+
+    record_version(keys[-1], keys[depart] if depart is not None else None, patch)
+    if len(keys) - 1 - _base_index(keys) > DELTA_JOURNAL_MAX:
+        # Journal trop long à rejouer au démarrage: le jeu complet devient la nouvelle base
+        _write_cache(data, _cache_file(keys[-1]))
+    data.attrs["dataset_key"] = keys[-1]
+    _latest = (keys[-1], data)
+    return data
+
+
+def _read_cached_chain(keys: tuple) -> tuple:
+    """(jeu, n) depuis la base la plus avancée de la chaîne et les deltas journalisés à sa suite"""
+    base = _base_index(keys)
+    if base < 0:
+        return None, 0
+    with sub_stage("lecture du cache Parquet"):
+        data = _read_cache(_cache_file(keys[base]))
+    if data is None:
+        return None, 0
+    appliques = base
+    for key in keys[base + 1:]:
+        delta = _read_cache(_journal_file(key))
+        if delta is None:
+            break
+        with sub_stage("delta journalisé"):
+            data = apply_delta(data, delta)
+        appliques += 1
+    return data, appliques
+
+
+def _base_index(keys: tuple) -> int:
+    """Position dans keys de la base complète la plus avancée sur disque (-1 si aucune)"""
+    for n in range(len(keys) - 1, -1, -1):
+        if _cache_file(keys[n]).exists():
+            return n
+    return -1
+
+
+def _load_uploaded_dataset(key: str, uploaded, postal_digest: str) -> pd.DataFrame:
+    cache_miss()
+    uploaded.seek(0)
+    data = _load_and_enrich(uploaded, postal_digest)
+    data.attrs["dataset_key"] = key
+    return data
+
+
+def _load_and_enrich(source, postal_digest: str) -> pd.DataFrame:
+    """load_data puis enrichissement géographique, mesurés comme deux étapes distinctes"""
+    with sub_stage("chargement") as etape:
+        data = load_data(source)
+        etape.rows(len(data))
+    with sub_stage("enrichissement") as etape:
+        data = _enrich(data, postal_digest)
+        etape.rows(len(data))
+    return data
+
+
+def _enrich(data: pd.DataFrame, postal_digest: str) -> pd.DataFrame:
+    """Enrichissement avec l'index postal du CSV d'empreinte postal_digest (celle de la clé du jeu)"""
+    postal_index = load_postal_index(postal_digest)
+    return enrich_with_geo_data(data, postal_index) if not postal_index.empty else data
+
+
+def _cache_file(key: str) -> Path:
+    return CACHE_DIR / f"formations_{key}.parquet"
+
+
+def _journal_file(key: str) -> Path:
+    return CACHE_DIR / f"delta_{key}.parquet"
+
+
+def _read_cache(cache_file: Path):
+    if not cache_file.exists():
+        return None
+    try:
+        return pd.read_parquet(cache_file, memory_map=True)
+    except Exception as e:
+        logger.warning("Cache %s illisible, reconstruction: %s", cache_file, e)
+        return None
+
+
+def _write_cache(df: pd.DataFrame, cache_file: Path) -> None:
+    """Écrit la base complète et supprime les versions et journaux obsolètes"""
+    if not _write_parquet(df, cache_file):
+        return
+    for old in [*cache_file.parent.glob("formations_*.parquet"), *cache_file.parent.glob("delta_*.parquet")]:
+        if old != cache_file:
+            old.unlink(missing_ok=True)
+
+
+def _write_parquet(df: pd.DataFrame, cache_file: Path) -> bool:
+    """Écriture atomique; False si le cache n'a pas pu être écrit"""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_suffix(".tmp")
+        df.to_parquet(tmp_file, index=False)
+        os.replace(tmp_file, cache_file)
+        return True
+    except Exception as e:
+        # Le cache est une optimisation: un disque en lecture seule ne doit pas bloquer l'app
+        logger.warning("Impossible d'écrire le cache %s: %s", cache_file, e)
+        return False
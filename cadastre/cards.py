@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Cartes lues de part et d'autre de la carte affichée
+CARD_PREFETCH = 5
+# Entrées de la liste « Aller à une formation »
+JUMP_LIST_SIZE = 200
+
+
+class CardWindow:
+    """Fiches des formations filtrées, accessibles par position dans la sélection.
+
+    La carte demandée et ses voisines sont extraites en un seul data.iloc;
+    tant que la navigation reste dans cette fenêtre, chaque carte est servie
+    sans toucher au DataFrame.
+    """
+
+    def __init__(self, data: pd.DataFrame, rows: np.ndarray, columns, prefetch: int = CARD_PREFETCH):
+        self.data = data
+        self.rows = rows
+        self.columns = [data.columns.get_loc(c) for c in columns]
+        self.prefetch = prefetch
+        self.start = self.stop = 0
+        self.records = []
+        self._positions = None
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def get(self, position: int) -> dict:
+        if not self.start <= position < self.stop:
+            self._load(position)
+        return self.records[position - self.start]
+
+    def _load(self, position: int) -> None:
+        self.start = max(0, position - self.prefetch)
+        self.stop = min(len(self.rows), position + self.prefetch + 1)
+        self.records = self.data.iloc[self.rows[self.start:self.stop], self.columns].to_dict('records')
+
+    def positions_of(self, matches: np.ndarray, limit: int = JUMP_LIST_SIZE) -> np.ndarray:
+        """Positions dans la sélection des lignes trouvées (ordre de matches conservé)"""
+        if self._positions is None:
+            self._positions = pd.Index(self.rows)
+        positions = self._positions.get_indexer(matches[:limit])
+        return positions[positions >= 0]
+
+    def values(self, positions: np.ndarray, column: str) -> list:
+        """Valeurs d'une colonne pour plusieurs positions (libellés de la liste), en un seul accès"""
+        return self.data[column].iloc[self.rows[positions]].tolist()
+
+    def around(self, position: int, limit: int = JUMP_LIST_SIZE) -> np.ndarray:
+        """Positions voisines de position, pour la liste sans recherche"""
+        start = min(max(0, position - limit // 2), max(0, len(self.rows) - limit))
+        return np.arange(start, min(len(self.rows), start + limit))
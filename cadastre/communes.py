@@ -0,0 +1,62 @@
+"""Les 262 communes wallonnes et leur province (noms officiels en français)."""
+
+_COMMUNES_PAR_PROVINCE = {
+    "Brabant wallon": [
+        "Beauvechain", "Braine-l'Alleud", "Braine-le-Château", "Chastre", "Chaumont-Gistoux",
+        "Court-Saint-Étienne", "Genappe", "Grez-Doiceau", "Hélécine", "Incourt", "Ittre",
+        "Jodoigne", "La Hulpe", "Lasne", "Mont-Saint-Guibert", "Nivelles", "Orp-Jauche",
+        "Ottignies-Louvain-la-Neuve", "Perwez", "Ramillies", "Rebecq", "Rixensart", "Tubize",
+        "Villers-la-Ville", "Walhain", "Waterloo", "Wavre",
+    ],
+    "Hainaut": [
+        "Aiseau-Presles", "Anderlues", "Antoing", "Ath", "Beaumont", "Belœil", "Bernissart",
+        "Binche", "Boussu", "Braine-le-Comte", "Brugelette", "Brunehaut", "Celles",
+        "Chapelle-lez-Herlaimont", "Charleroi", "Châtelet", "Chièvres", "Chimay", "Colfontaine",
+        "Comines-Warneton", "Courcelles", "Dour", "Écaussinnes", "Ellezelles", "Enghien",
+        "Erquelinnes", "Estaimpuis", "Estinnes", "Farciennes", "Fleurus", "Flobecq",
+        "Fontaine-l'Évêque", "Frameries", "Frasnes-lez-Anvaing", "Froidchapelle", "Gerpinnes",
+        "Ham-sur-Heure-Nalinnes", "Hensies", "Honnelles", "Jurbise", "La Louvière", "Le Rœulx",
+        "Lens", "Les Bons Villers", "Lessines", "Leuze-en-Hainaut", "Lobbes", "Manage",
+        "Merbes-le-Château", "Momignies", "Mons", "Mont-de-l'Enclus", "Montigny-le-Tilleul",
+        "Morlanwelz", "Mouscron", "Pecq", "Péruwelz", "Pont-à-Celles", "Quaregnon", "Quévy",
+        "Quiévrain", "Rumes", "Saint-Ghislain", "Seneffe", "Silly", "Sivry-Rance", "Soignies",
+        "Thuin", "Tournai",
+    ],
+    "Liège": [
+        "Amay", "Amblève", "Ans", "Anthisnes", "Aubel", "Awans", "Aywaille", "Baelen", "Bassenge",
+        "Berloz", "Beyne-Heusay", "Blegny", "Braives", "Bullange", "Burdinne", "Burg-Reuland",
+        "Butgenbach", "Chaudfontaine", "Clavier", "Comblain-au-Pont", "Crisnée", "Dalhem",
+        "Dison", "Donceel", "Engis", "Esneux", "Eupen", "Faimes", "Ferrières",
+        "Fexhe-le-Haut-Clocher", "Flémalle", "Fléron", "Geer", "Grâce-Hollogne", "Hamoir",
+        "Hannut", "Héron", "Herstal", "Herve", "Huy", "Jalhay", "Juprelle", "La Calamine",
+        "Liège", "Lierneux", "Limbourg", "Lincent", "Lontzen", "Malmedy", "Marchin", "Modave",
+        "Nandrin", "Neupré", "Olne", "Oreye", "Ouffet", "Oupeye", "Pepinster", "Plombières",
+        "Raeren", "Remicourt", "Saint-Georges-sur-Meuse", "Saint-Nicolas", "Saint-Vith",
+        "Seraing", "Soumagne", "Spa", "Sprimont", "Stavelot", "Stoumont", "Theux",
+        "Thimister-Clermont", "Tinlot", "Trois-Ponts", "Trooz", "Verlaine", "Verviers",
+        "Villers-le-Bouillet", "Visé", "Waimes", "Wanze", "Waremme", "Wasseiges", "Welkenraedt",
+    ],
+    "Luxembourg": [
+        "Arlon", "Attert", "Aubange", "Bastogne", "Bertogne", "Bertrix", "Bouillon", "Chiny",
+        "Daverdisse", "Durbuy", "Érezée", "Étalle", "Fauvillers", "Florenville", "Gouvy", "Habay",
+        "Herbeumont", "Hotton", "Houffalize", "La Roche-en-Ardenne", "Léglise", "Libin",
+        "Libramont-Chevigny", "Manhay", "Marche-en-Famenne", "Martelange", "Meix-devant-Virton",
+        "Messancy", "Musson", "Nassogne", "Neufchâteau", "Paliseul", "Rendeux", "Rouvroy",
+        "Saint-Hubert", "Saint-Léger", "Sainte-Ode", "Tellin", "Tenneville", "Tintigny",
+        "Vaux-sur-Sûre", "Vielsalm", "Virton", "Wellin",
+    ],
+    "Namur": [
+        "Andenne", "Anhée", "Assesse", "Beauraing", "Bièvre", "Cerfontaine", "Ciney", "Couvin",
+        "Dinant", "Doische", "Éghezée", "Fernelmont", "Floreffe", "Florennes", "Fosses-la-Ville",
+        "Gedinne", "Gembloux", "Gesves", "Hamois", "Hastière", "Havelange", "Houyet",
+        "Jemeppe-sur-Sambre", "La Bruyère", "Mettet", "Namur", "Ohey", "Onhaye", "Philippeville",
+        "Profondeville", "Rochefort", "Sambreville", "Sombreffe", "Somme-Leuze", "Viroinval",
+        "Vresse-sur-Semois", "Walcourt", "Yvoir",
+    ],
+}
+
+COMMUNES_WALLONNES = {
+    commune: province
+    for province, communes in _COMMUNES_PAR_PROVINCE.items()
+    for commune in communes
+}
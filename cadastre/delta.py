@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from cadastre.geo import enrich_with_geo_data, load_postal_index
+from cadastre.ingestion import load_data
+
+# Clé des lignes du cadastre: un delta remplace toutes les lignes d'un même code
+DELTA_KEY = "codeexterne"
+# Colonne optionnelle du delta; "SUPPRIMER" retire le code au lieu de le remplacer
+DELTA_ACTION = "action"
+DELTA_SUPPRESSION = "SUPPRIMER"
+# Versions du jeu par défaut dont la filiation et les index sont gardés (la courante et la précédente)
+LINEAGE_VERSIONS = 2
+
+
+def read_delta(path, postal_digest: str) -> pd.DataFrame:
+    """Charge un delta et dérive province, durée et géographie sur ses seules lignes"""
+    delta = load_data(path)
+    if DELTA_KEY not in delta.columns:
+        raise ValueError(f"Delta {path}: colonne '{DELTA_KEY}' absente")
+    postal_index = load_postal_index(postal_digest)
+    if not postal_index.empty:
+        delta = enrich_with_geo_data(delta, postal_index)
+    return delta
+
+
+def apply_delta(data: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Upsert/suppression par codeexterne: les lignes non concernées sont reprises telles quelles"""
+    return patch_delta(data, delta)[0]
+
+
+def patch_delta(data: pd.DataFrame, delta: pd.DataFrame) -> tuple:
+    """(jeu mis à jour, DeltaPatch décrivant le passage de data à ce jeu)"""
+    if DELTA_ACTION in delta.columns:
+        action = delta[DELTA_ACTION].astype(object).fillna("").astype(str).str.strip().str.upper()
+        upserts = delta[(action != DELTA_SUPPRESSION).to_numpy()]
+    else:
+        upserts = delta
+    touchees = data[DELTA_KEY].isin(delta[DELTA_KEY]).to_numpy()
+    conservees, retirees = np.flatnonzero(~touchees), np.flatnonzero(touchees)
+    updated = _concat_typed(data.iloc[conservees], upserts)
+    origin = np.concatenate([conservees, np.full(len(upserts), -1, dtype=np.intp)])
+    return updated, DeltaPatch(origin, len(data), data.iloc[retirees], retirees)
+
+
+class DeltaPatch:
+    """Passage d'un jeu à sa version mise à jour, exprimé en positions de lignes.
+
+    Les lignes conservées gardent leur ordre relatif et précèdent toutes les
+    lignes ajoutées (en fin de jeu). Les index (filtres, recherche, cube) s'en
+    servent pour se mettre à jour à partir des seules lignes du delta.
+    """
+
+    def __init__(self, origin: np.ndarray, n_old: int, removed: pd.DataFrame, removed_positions: np.ndarray):
+        self.origin = origin  # position dans l'ancien jeu de chaque ligne du nouveau, -1 si ajoutée
+        self.n_old = n_old
+        self.removed = removed  # anciennes lignes retirées ou remplacées
+        self.removed_positions = removed_positions
+
+    @property
+    def added(self) -> np.ndarray:
+        """Positions (dans le nouveau jeu) des lignes ajoutées"""
+        return np.flatnonzero(self.origin < 0)
+
+    @property
+    def kept(self) -> np.ndarray:
+        """Positions (dans le nouveau jeu) des lignes reprises de l'ancien"""
+        return np.flatnonzero(self.origin >= 0)
+
+    def new_positions(self) -> np.ndarray:
+        """Nouvelle position de chaque ancienne ligne (-1 si retirée)"""
+        positions = np.full(self.n_old, -1, dtype=np.intp)
+        kept = self.kept
+        positions[self.origin[kept]] = kept
+        return positions
+
+    def then(self, other: "DeltaPatch") -> "DeltaPatch":
+        """Composition: self (A -> B) puis other (B -> C) donne A -> C"""
+        origin = np.where(other.origin >= 0, self.origin[np.maximum(other.origin, 0)], -1)
+        # Parmi les lignes de B retirées par other, seules celles venues de A sont des retraits pour A
+        de_a = self.origin[other.removed_positions] >= 0
+        removed = pd.concat([self.removed, other.removed[de_a]])
+        removed_positions = np.concatenate([self.removed_positions, self.origin[other.removed_positions[de_a]]])
+        return DeltaPatch(origin, self.n_old, removed, removed_positions)
+
+
+# Versions du jeu par défaut, seules à pouvoir recevoir un delta: clé -> (clé précédente, DeltaPatch)
+# ou None pour une version chargée sans filiation. Seuls leurs index sont gardés ici.
+_versions = OrderedDict()
+_structures = {}
+_lock = threading.Lock()
+
+
+def record_version(dataset_key: str, parent_key: str = None, patch: DeltaPatch = None) -> None:
+    """Déclare une version du jeu par défaut (et, si elle vient d'un delta, la version dont elle dérive)"""
+    with _lock:
+        _versions[dataset_key] = (parent_key, patch) if patch is not None else None
+        _versions.move_to_end(dataset_key)
+        while len(_versions) > LINEAGE_VERSIONS:
+            _versions.popitem(last=False)
+        # Index des versions oubliées: libérés (il ne reste que ceux des caches Streamlit)
+        for cle in [cle for cle in _structures if cle[1] not in _versions]:
+            del _structures[cle]
+
+
+def incremental_build(kind: tuple, dataset_key: str, df: pd.DataFrame, build, patch):
+    """Construit un index du jeu, ou le dérive de celui de la version précédente si elle est connue.
+
+    kind identifie l'index et ses paramètres; build(df) construit de zéro,
+    patch(index précédent, DeltaPatch, df) met à jour depuis les lignes du delta.
+    Seuls les index des versions du jeu par défaut sont gardés pour le delta
+    suivant: ceux des imports restent bornés par les caches qui les détiennent.
+    """
+    with _lock:
+        parent_key, delta_patch = _versions.get(dataset_key) or (None, None)
+        precedent = _structures.get((kind, parent_key))
+    result = patch(precedent, delta_patch, df) if precedent is not None else build(df)
+    with _lock:
+        if dataset_key in _versions:
+            _structures[(kind, dataset_key)] = result
+    return result
+
+
+def _concat_typed(base: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """Ajoute rows à base en conservant les types compacts de base (catégories étendues au besoin)"""
+    rows = rows.reindex(columns=base.columns)
+    dtypes = {}
+    for col, dtype in base.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            nouvelles = pd.Index(rows[col].dropna().unique()).difference(dtype.categories)
+            if len(nouvelles):
+                # Union triée: options des filtres et tris restent dans l'ordre alphabétique
+                base[col] = base[col].cat.set_categories(dtype.categories.union(nouvelles).sort_values())
+            dtype = base[col].dtype
+        dtypes[col] = dtype
+    return pd.concat([base, rows.astype(dtypes)], ignore_index=True)
@@ -0,0 +1,63 @@
+import gzip
+import tempfile
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Nombre de lignes sérialisées à la fois: la mémoire de travail ne dépend pas de la taille de l'export
+CHUNK_ROWS = 50_000
+
+# Format -> (nom de fichier, type MIME)
+EXPORT_FORMATS = {
+    "CSV (;)": ("formations_filtered.csv", "text/csv"),
+    "CSV compressé (gzip)": ("formations_filtered.csv.gz", "application/gzip"),
+    "Parquet": ("formations_filtered.parquet", "application/vnd.apache.parquet"),
+}
+
+
+def iter_chunks(data: pd.DataFrame, rows, columns, chunk_rows: int = CHUNK_ROWS):
+    """Tranches successives des lignes et colonnes exportées, sans copie du jeu complet"""
+    positions = [data.columns.get_loc(c) for c in columns]
+    for start in range(0, max(len(rows), 1), chunk_rows):
+        yield data.iloc[rows[start:start + chunk_rows], positions]
+
+
+def oui_non(chunk: pd.DataFrame) -> pd.DataFrame:
+    """Indicateurs booléens réécrits en OUI/NON, comme dans le fichier source"""
+    flags = {c: chunk[c].map({True: "OUI", False: "NON"}) for c in chunk.columns if chunk[c].dtype == "boolean"}
+    return chunk.assign(**flags) if flags else chunk
+
+
+def write_csv(data: pd.DataFrame, rows, columns, fileobj) -> None:
+    """CSV ';' en UTF-8 avec BOM (lisible tel quel par Excel), écrit tranche par tranche"""
+    fileobj.write("\ufeff".encode("utf-8"))
+    for i, chunk in enumerate(iter_chunks(data, rows, columns)):
+        fileobj.write(oui_non(chunk).to_csv(index=False, sep=';', header=(i == 0)).encode("utf-8"))
+
+
+def write_parquet(data: pd.DataFrame, rows, columns, fileobj) -> None:
+    """Parquet avec un groupe de lignes par tranche"""
+    writer = None
+    for chunk in iter_chunks(data, rows, columns):
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(fileobj, table.schema)
+        writer.write_table(table)
+    writer.close()
+
+
+def export_file(export_format: str, data: pd.DataFrame, rows, columns) -> bytes:
+    """Contenu de l'export, sérialisé tranche par tranche dans un fichier temporaire (sur disque)"""
+    # st.download_button relit de toute façon les données en bytes: le fichier n'est qu'un tampon
+    # d'écriture, qui évite de garder en mémoire les tranches et le résultat en même temps
+    with tempfile.TemporaryFile() as fileobj:
+        if export_format == "Parquet":
+            write_parquet(data, rows, columns, fileobj)
+        elif export_format == "CSV compressé (gzip)":
+            with gzip.GzipFile(fileobj=fileobj, mode="wb") as gz:
+                write_csv(data, rows, columns, gz)
+        else:
+            write_csv(data, rows, columns, fileobj)
+        fileobj.seek(0)
+        return fileobj.read()
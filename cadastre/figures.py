@@ -0,0 +1,372 @@
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from cadastre.ingestion import PROVINCES_WALLONNES
+
+MAP_CENTER = dict(lat=50.5, lon=4.8)
+DEFAULT_COLOR = '#636EFA'
+# Points envoyés au navigateur par le nuage des durées; au-delà, échantillon stratifié + boîtes exactes
+STRIP_POINT_BUDGET = int(os.environ.get("CADASTRE_STRIP_POINTS", "2000"))
+# Points gardés au minimum par province échantillonnée
+STRIP_MIN_POINTS = 20
+
+
+def province_colors(provinces: pd.Series) -> list:
+    """Couleur de chaque province (couleur par défaut hors Wallonie)"""
+    return [PROVINCES_WALLONNES.get(p, {}).get('color', DEFAULT_COLOR) for p in provinces]
+
+
+def scatter_map(points: pd.DataFrame, sizes, label_col: str, customdata_cols: list,
+                hovertemplate: str, zoom: float, show_text: bool = True) -> go.Figure:
+    """Carte à une seule trace: taille, couleur et survol portés par des tableaux par point"""
+    fig = go.Figure(go.Scattermapbox(
+        lat=points['latitude'],
+        lon=points['longitude'],
+        mode='markers+text' if show_text else 'markers',
+        marker=dict(size=sizes, color=province_colors(points['province']), opacity=0.7),
+        text=points[label_col],
+        textposition="top center",
+        customdata=points[customdata_cols].to_numpy(),
+        hovertemplate=hovertemplate,
+    ))
+    fig.update_layout(
+        mapbox=dict(
+            style="open-street-map",
+            center=MAP_CENTER,
+            zoom=zoom
+        ),
+        height=600,
+        showlegend=False,
+        margin={"r": 0, "t": 0, "l": 0, "b": 0}
+    )
+    return fig
+
+
+PROVINCE_COLOR_MAP = {p: PROVINCES_WALLONNES[p]['color'] for p in PROVINCES_WALLONNES}
+
+
+# ------------------------------------------------------------------------------
+# Carte des provinces
+# ------------------------------------------------------------------------------
+
+def province_counts(cube) -> pd.DataFrame:
+    counts = cube.counts("province")
+    return counts[counts['province'] != 'Non spécifié']
+
+
+def province_map(cube) -> go.Figure:
+    # Une seule trace pour toutes les provinces wallonnes
+    counts = province_counts(cube)
+    map_points = counts[counts['province'].isin(PROVINCES_WALLONNES)].copy()
+    map_points['latitude'] = map_points['province'].map(lambda p: PROVINCES_WALLONNES[p]['lat'])
+    map_points['longitude'] = map_points['province'].map(lambda p: PROVINCES_WALLONNES[p]['lon'])
+    return scatter_map(
+        map_points,
+        sizes=map_points['count'] / 5 + 20,
+        label_col='province',
+        customdata_cols=['count'],
+        hovertemplate="<b>%{text}</b><br>%{customdata[0]} formations<extra></extra>",
+        zoom=7
+    )
+
+
+def province_bar(cube) -> go.Figure:
+    fig = px.bar(
+        province_counts(cube).sort_values('count', ascending=True),
+        x='count',
+        y='province',
+        orientation='h',
+        title="Nombre de formations par province",
+        color='province',
+        color_discrete_map=PROVINCE_COLOR_MAP
+    )
+    fig.update_layout(showlegend=False, height=400)
+    return fig
+
+
+def province_pie(cube) -> go.Figure:
+    fig = px.pie(
+        province_counts(cube),
+        values='count',
+        names='province',
+        title="Répartition en % par province",
+        color='province',
+        color_discrete_map=PROVINCE_COLOR_MAP
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def arrondissement_map(cube) -> go.Figure:
+    # Agrégation par arrondissement avec coordonnées moyennes et comptage
+    arr_points = cube.centroids('arrondissement', attributes=['province']).dropna(subset=['latitude', 'longitude'])
+    arr_points['province'] = arr_points['province'].fillna('Non spécifié')
+    fig = scatter_map(
+        arr_points,
+        sizes=arr_points['count'] / 3 + 15,
+        label_col='arrondissement',
+        customdata_cols=['province', 'count'],
+        hovertemplate="<b>%{text}</b><br>Province: %{customdata[0]}<br>%{customdata[1]} formations<extra></extra>",
+        zoom=7.5
+    )
+    fig.update_traces(textfont=dict(size=9))
+    return fig
+
+
+def arrondissement_bar(cube) -> go.Figure:
+    # Top 15 arrondissements
+    top_arr = cube.centroids('arrondissement', attributes=['province']).nlargest(15, 'count')
+    fig = px.bar(
+        top_arr.sort_values('count', ascending=True),
+        x='count',
+        y='arrondissement',
+        orientation='h',
+        title="Top 15 arrondissements",
+        color='province',
+        color_discrete_map=PROVINCE_COLOR_MAP
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def arrondissement_province_bar(cube) -> go.Figure:
+    # Distribution par province dans les arrondissements
+    fig = px.bar(
+        cube.counts('province', 'arrondissement'),
+        x='province',
+        y='count',
+        color='arrondissement',
+        title="Arrondissements par province",
+        barmode='stack'
+    )
+    fig.update_layout(height=400, showlegend=False)
+    return fig
+
+
+def ville_map(cube) -> go.Figure:
+    # Toutes les villes localisées dans une seule trace
+    ville_points = cube.centroids('ville', attributes=['province', 'arrondissement']).dropna(subset=['latitude', 'longitude'])
+    ville_points['province'] = ville_points['province'].fillna('Non spécifié')
+    return scatter_map(
+        ville_points,
+        sizes=ville_points['count'] / 2 + 8,
+        label_col='ville',
+        customdata_cols=['arrondissement', 'province', 'count'],
+        hovertemplate="<b>%{text}</b><br>Arrondissement: %{customdata[0]}<br>" +
+                      "Province: %{customdata[1]}<br>%{customdata[2]} formations<extra></extra>",
+        zoom=8,
+        show_text=False
+    )
+
+
+def ville_bar(cube) -> go.Figure:
+    # Top 20 villes
+    top_villes = cube.centroids('ville', attributes=['province']).head(20)
+    fig = px.bar(
+        top_villes.sort_values('count', ascending=True),
+        x='count',
+        y='ville',
+        orientation='h',
+        title="Top 20 villes",
+        color='province',
+        color_discrete_map=PROVINCE_COLOR_MAP
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+# ------------------------------------------------------------------------------
+# Analyses
+# ------------------------------------------------------------------------------
+
+def organismes_bar(cube) -> go.Figure:
+    top_org = cube.counts("organisme").head(15)
+    fig = px.bar(
+        top_org,
+        x='count',
+        y='organisme',
+        orientation='h',
+        title="Top 15 types d'organismes",
+        color='count',
+        color_continuous_scale='Blues'
+    )
+    fig.update_layout(height=500)
+    return fig
+
+
+def categories_duree_pie(cube) -> go.Figure:
+    cat_duree = cube.counts("categorie_duree")
+    cat_duree.columns = ['categorie', 'count']
+    fig = px.pie(
+        cat_duree,
+        values='count',
+        names='categorie',
+        title="Répartition par catégorie de durée",
+        hole=0.4
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def cert_qual_bar(cube) -> go.Figure:
+    cert_qual_df = pd.DataFrame({
+        'Type': ['Qualifiantes', 'Certifiantes', 'Les deux', 'Aucune'],
+        'Count': [
+            cube.total(qualifiante=[True], certifiante=[False]),
+            cube.total(qualifiante=[False], certifiante=[True]),
+            cube.total(qualifiante=[True], certifiante=[True]),
+            cube.total(qualifiante=[False], certifiante=[False])
+        ]
+    })
+    fig = px.bar(
+        cert_qual_df,
+        x='Type',
+        y='Count',
+        title="Formations qualifiantes vs certifiantes",
+        color='Type',
+        color_discrete_sequence=['#1f77b4', '#ff7f0e', '#2ca02c', '#d62728']
+    )
+    fig.update_layout(height=400)
+    return fig
+
+
+def durees_histogram(df: pd.DataFrame, duree_col: str, nbins: int = 30):
+    """Histogramme des durées en heures (None si aucune durée).
+
+    Les classes sont comptées ici: la figure porte nbins barres quel que soit
+    le nombre de formations, au lieu de toutes les durées brutes.
+    """
+    durees = df[duree_col].to_numpy(dtype=float, na_value=np.nan)
+    durees = durees[durees > 0]
+    if len(durees) == 0:
+        return None
+    edges = histogram_edges(durees.min(), durees.max(), nbins)
+    counts, _ = np.histogram(durees, bins=edges)
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        marker_color='#636EFA',
+        hovertemplate="%{customdata[0]:g} - %{customdata[1]:g} h<br>%{y} formations<extra></extra>",
+    ))
+    fig.update_layout(
+        title="Distribution des durées (en heures)",
+        xaxis_title=duree_col,
+        yaxis_title="count",
+        bargap=0,
+        height=400
+    )
+    return fig
+
+
+def histogram_edges(lo: float, hi: float, nbins: int) -> np.ndarray:
+    """Bornes de classes de largeur 'ronde' (1, 2, 2.5 ou 5 x 10^k), comme l'auto-binning de Plotly"""
+    raw = max(hi - lo, 1) / nbins
+    magnitude = 10 ** math.floor(math.log10(raw))
+    step = next(m * magnitude for m in (1, 2, 2.5, 5, 10) if m * magnitude >= raw)
+    start = math.floor(lo / step) * step
+    count = max(math.ceil((hi - start) / step), 1)
+    # Classes [a, b[ comme Plotly: une durée égale à la dernière borne ouvre une classe de plus
+    return start + step * np.arange(count + 1 + (start + count * step == hi))
+
+
+# ------------------------------------------------------------------------------
+# Graphiques avancés
+# ------------------------------------------------------------------------------
+
+def hierarchy_sunburst(cube):
+    """Sunburst Province > Organisme > Catégorie durée (None si vide)"""
+    nodes = cube.hierarchy("province", "organisme", "categorie_duree", exclude=["Non spécifié"])
+    if len(nodes) == 0:
+        return None
+    fig = go.Figure(hierarchy_trace(go.Sunburst, nodes))
+    fig.update_layout(title="Hiérarchie Province → Type d'organisme → Catégorie de durée", height=600)
+    return fig
+
+
+def organismes_treemap(cube):
+    """Treemap Organisme > Catégorie durée (None si vide)"""
+    nodes = cube.hierarchy("organisme", "categorie_duree", threshold=2)  # Filtre les petites valeurs
+    if len(nodes) == 0:
+        return None
+    fig = go.Figure(hierarchy_trace(go.Treemap, nodes))
+    fig.update_layout(title="Treemap: Organisme → Catégorie de durée", height=500)
+    return fig
+
+
+def hierarchy_trace(trace, nodes: pd.DataFrame):
+    """Trace go.Sunburst / go.Treemap depuis les nœuds précalculés (id, label, parent, count)"""
+    return trace(
+        ids=nodes['id'],
+        labels=nodes['label'],
+        parents=nodes['parent'],
+        values=nodes['count'],
+        branchvalues='total',
+        hovertemplate="<b>%{label}</b><br>%{value} formations<extra></extra>",
+    )
+
+
+def durees_province_strip(df: pd.DataFrame, colmap: dict, budget: int = STRIP_POINT_BUDGET):
+    """Nuage des durées par province (None si aucune durée).
+
+    Au-delà de budget points, le nuage est un échantillon stratifié par
+    province, complété par une boîte à moustaches calculée sur toutes les
+    durées: la taille de la figure ne dépend plus du nombre de formations.
+    """
+    province_col, duree_col = colmap["province"], colmap["duree_h"]
+    scatter_df = df[
+        (df[duree_col].notna()) &
+        (df[duree_col] > 0) &
+        (df[province_col] != "Non spécifié")
+    ]
+    if len(scatter_df) == 0:
+        return None
+    sampled = len(scatter_df) > budget
+    points = stratified_sample(scatter_df, province_col, budget) if sampled else scatter_df
+    title = "Distribution des durées par province"
+    if sampled:
+        title += f" (échantillon de {len(points)} sur {len(scatter_df)})"
+    fig = px.strip(
+        points,
+        x=province_col,
+        y=duree_col,
+        title=title,
+        color=province_col
+    )
+    if sampled:
+        colors = {trace.name: trace.marker.color for trace in fig.data}
+        for province, durees in scatter_df.groupby(province_col, observed=True, sort=False)[duree_col]:
+            fig.add_trace(_box_summary(province, durees.to_numpy(dtype=float), colors.get(province)))
+        fig.update_layout(boxmode='overlay')
+    fig.update_layout(height=500)
+    return fig
+
+
+def stratified_sample(df: pd.DataFrame, strate: str, budget: int, seed: int = 0) -> pd.DataFrame:
+    """Échantillon d'environ budget lignes, proportionnel à chaque strate (au moins STRIP_MIN_POINTS)"""
+    effectifs = df[strate].value_counts()
+    quotas = np.maximum(np.floor(effectifs * budget / len(df)), np.minimum(effectifs, STRIP_MIN_POINTS))
+    # Tirage reproductible: le même filtre donne le même nuage d'un rerun à l'autre
+    shuffled = df.iloc[np.random.default_rng(seed).permutation(len(df))]
+    rang = shuffled.groupby(strate, observed=True).cumcount().to_numpy()
+    quota = shuffled[strate].astype(object).map(quotas).to_numpy(dtype=float)
+    return shuffled[rang < quota]
+
+
+def _box_summary(name, values: np.ndarray, color) -> go.Box:
+    """Boîte précalculée (quartiles, moustaches à 1.5 IQR) sans les valeurs brutes"""
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    return go.Box(
+        x=[name], name=name, q1=[q1], median=[median], q3=[q3],
+        lowerfence=[inside.min()], upperfence=[inside.max()],
+        marker_color=color, fillcolor='rgba(0,0,0,0)', boxpoints=False,
+        showlegend=False, hoverinfo='y'
+    )
@@ -0,0 +1,111 @@
+import codecs
+import csv
+import functools
+import hashlib
+import io
+import logging
+import os
+
+import pandas as pd
+import pyarrow.csv as pa_csv
+
+logger = logging.getLogger(__name__)
+
+# Taille de l'échantillon lu pour détecter le format d'un CSV
+SNIFF_BYTES = 64 * 1024
+CSV_SEPARATORS = (';', ',', '\t')
+# cp1252 couvre les exports Excel français; latin-1 décode n'importe quel octet
+CSV_ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+# Valeurs lues comme manquantes, les mêmes que pandas.read_csv
+CSV_NA_VALUES = ['', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+                 '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null']
+
+
+def file_digest(path) -> str:
+    """Empreinte SHA-256 du contenu d'un fichier ('absent' s'il n'existe pas)"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "absent"
+    # Le contenu n'est relu que si la taille ou la date de modification changent
+    return _digest(os.fspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+@functools.lru_cache(maxsize=256)
+def _digest(path: str, size: int, mtime_ns: int) -> str:
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return "absent"
+    return digest.hexdigest()
+
+
+def sniff_csv(source, separators=CSV_SEPARATORS) -> tuple:
+    """(encodage, séparateur) déduits des premiers Ko d'un chemin ou d'un fichier ouvert"""
+    sample = _read_sample(source)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        encoding = next(e for e in CSV_ENCODINGS if _decodes(sample, e))
+    texte = codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+
+    # La dernière ligne de l'échantillon peut être tronquée: elle est ignorée
+    if len(sample) == SNIFF_BYTES and "\n" in texte:
+        texte = texte[:texte.rindex("\n") + 1]
+
+    def score(sep):
+        largeurs = [len(row) for row in csv.reader(io.StringIO(texte, newline=''), delimiter=sep) if row]
+        if not largeurs:
+            return (False, 0)
+        # Séparateur retenu: même nombre de colonnes sur toutes les lignes, et le plus de colonnes
+        return (len(set(largeurs)) == 1, largeurs[0])
+
+    return encoding, max(separators, key=score)
+
+
+def read_csv(source, separators=CSV_SEPARATORS, name=None) -> pd.DataFrame:
+    """Lit un CSV en une seule passe (lecteur pyarrow) après détection du format"""
+    encoding, sep = sniff_csv(source, separators)
+    logger.info("CSV %s: encodage %s, séparateur %r", name or source, encoding, sep)
+    try:
+        # newlines_in_values: des champs entre guillemets contiennent des retours à la ligne
+        # (condition_specifique); sans cette option pyarrow échoue dès que le fichier dépasse un bloc
+        table = pa_csv.read_csv(
+            _rewind(source),
+            read_options=pa_csv.ReadOptions(encoding=encoding),
+            parse_options=pa_csv.ParseOptions(delimiter=sep, newlines_in_values=True),
+            convert_options=pa_csv.ConvertOptions(null_values=CSV_NA_VALUES, strings_can_be_null=True),
+        )
+        return table.to_pandas()
+    except Exception as e:
+        # Octets invalides au-delà de l'échantillon, lignes irrégulières...: le moteur C est plus tolérant
+        logger.warning("Lecture pyarrow de %s impossible (%s), repli sur le moteur C", name or source, e)
+        return pd.read_csv(_rewind(source), sep=sep, encoding=encoding, encoding_errors='replace')
+
+
+def _read_sample(source) -> bytes:
+    if hasattr(source, "read"):
+        source.seek(0)
+        sample = source.read(SNIFF_BYTES)
+        source.seek(0)
+        return sample
+    with open(source, "rb") as f:
+        return f.read(SNIFF_BYTES)
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    try:
+        codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+        return True
+    except UnicodeDecodeError:
+        return False
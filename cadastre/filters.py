@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cadastre.delta import incremental_build
+from cadastre.instrumentation import cache_miss
+
+
+class FilterEngine:
+    """Index bitmap (une bitmap compressée par valeur) des colonnes filtrables.
+
+    Les sélections se combinent par OU au sein d'une colonne et par ET entre
+    colonnes, sur des tableaux d'octets: aucun DataFrame intermédiaire n'est
+    créé avant l'extraction finale des indices de lignes.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns):
+        self.n_rows = len(df)
+        self._bitmaps = {}
+        for col in columns:
+            if col is None or col not in df.columns:
+                continue
+            codes, valeurs = pd.factorize(df[col], sort=True)
+            self._bitmaps[col] = {valeur: np.packbits(codes == i) for i, valeur in enumerate(valeurs)}
+
+    def patched(self, patch, df: pd.DataFrame) -> "FilterEngine":
+        """Moteur du jeu mis à jour: bitmaps existantes déplacées, seules les lignes ajoutées sont factorisées"""
+        # Lignes conservées dans leur ordre, puis lignes ajoutées: chaque bitmap est compactée puis prolongée
+        garde = np.zeros(self.n_rows, dtype=bool)
+        garde[patch.origin[patch.kept]] = True
+        absentes = np.zeros(len(patch.kept), dtype=bool)
+        engine = FilterEngine(df.iloc[:0], [])
+        engine.n_rows = len(df)
+        for col, bitmaps in self._bitmaps.items():
+            codes, valeurs = pd.factorize(df[col].iloc[patch.added], sort=True)
+            ajouts = {valeur: codes == i for i, valeur in enumerate(valeurs)}
+            engine._bitmaps[col] = {}
+            for valeur in sorted(set(bitmaps) | set(ajouts)):
+                anciennes = (np.unpackbits(bitmaps[valeur], count=self.n_rows).view(bool)[garde]
+                             if valeur in bitmaps else absentes)
+                bits = np.concatenate([anciennes, ajouts.get(valeur, np.zeros(len(codes), dtype=bool))])
+                if bits.any():
+                    engine._bitmaps[col][valeur] = np.packbits(bits)
+        return engine
+
+    def all(self) -> np.ndarray:
+        """Bitmap de toutes les lignes"""
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def mask(self, col, values) -> np.ndarray:
+        """Bitmap des lignes dont la colonne vaut l'une des valeurs"""
+        result = np.zeros((self.n_rows + 7) // 8, dtype=np.uint8)
+        bitmaps = self._bitmaps.get(col, {})
+        for value in values:
+            if value in bitmaps:
+                result |= bitmaps[value]
+        return result
+
+    def options(self, col, mask=None) -> list:
+        """Valeurs (triées, hors manquantes) présentes parmi les lignes du masque"""
+        bitmaps = self._bitmaps.get(col, {})
+        if mask is None:
+            return list(bitmaps)
+        return [value for value, bitmap in bitmaps.items() if np.bitwise_and(bitmap, mask).any()]
+
+    def indices(self, mask) -> np.ndarray:
+        """Positions des lignes sélectionnées"""
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows))
+
+    def count(self, mask) -> int:
+        return int(np.unpackbits(mask, count=self.n_rows).sum())
+
+
+@st.cache_resource(max_entries=8)
+def build_filter_engine(dataset_key: str, _df: pd.DataFrame, columns: tuple) -> FilterEngine:
+    """Moteur de filtres construit une fois par jeu de données (identifié par sa clé, sans hacher le DataFrame).
+
+    Un jeu issu d'un delta reprend le moteur de la version précédente.
+    """
+    cache_miss()
+    return incremental_build(("filtres", columns), dataset_key, _df,
+                             build=lambda df: FilterEngine(df, columns),
+                             patch=lambda engine, delta_patch, df: engine.patched(delta_patch, df))
@@ -0,0 +1,137 @@
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+from cadastre.files import file_digest, read_csv
+from cadastre.instrumentation import cache_miss
+from cadastre.schema import apply_schema
+
+logger = logging.getLogger(__name__)
+
+POSTAL_CODES_PATH = 'data/postal-codes-belgium.csv'
+POSTAL_INDEX_PATH = 'data/postal-index.parquet'
+# À incrémenter dès que le format de build_postal_index change
+POSTAL_INDEX_VERSION = "1"
+
+
+@st.cache_data
+def load_postal_codes(source_digest: str) -> pd.DataFrame:
+    """Charge les données des codes postaux belges (source_digest: empreinte du CSV, clé du cache)"""
+    cache_miss()
+    try:
+        postal_df = read_csv(POSTAL_CODES_PATH)
+        postal_df.columns = [c.strip() for c in postal_df.columns]
+        return postal_df
+    except Exception as e:
+        st.warning(f"Impossible de charger les codes postaux: {e}")
+        return pd.DataFrame()
+
+
+def build_postal_index(postal_df: pd.DataFrame) -> pd.DataFrame:
+    """Table ville normalisée -> arrondissement, province, coordonnées (floats)"""
+    # Créer une table de lookup depuis les codes postaux
+    postal_lookup = postal_df[['Municipality name (French)',
+                                'Arrondissement name (French)',
+                                'Province name (French)',
+                                '_Geo Point']].copy()
+    postal_lookup.columns = ['ville', 'arrondissement', 'province_geo', 'geo_point']
+
+    # Normaliser les noms de villes dans le fichier postal
+    postal_lookup['ville_normalized'] = postal_lookup['ville'].str.strip().str.lower()
+
+    # Prendre la première occurrence de chaque ville (avec ses coordonnées moyennes si multiples)
+    postal_index = postal_lookup.groupby('ville_normalized').agg({
+        'ville': 'first',
+        'arrondissement': 'first',
+        'province_geo': 'first',
+        'geo_point': 'first'
+    })
+
+    # Parser les coordonnées GPS une fois pour toutes
+    postal_index['latitude'], postal_index['longitude'] = split_geo_points(postal_index['geo_point'])
+    return postal_index
+
+
+def compile_postal_index(index_path: str = POSTAL_INDEX_PATH, source_digest: str = None) -> pd.DataFrame:
+    """Compile le CSV des codes postaux en index Parquet versionné"""
+    if source_digest is None:
+        source_digest = file_digest(POSTAL_CODES_PATH)
+    postal_df = load_postal_codes(source_digest)
+    if postal_df.empty:
+        return pd.DataFrame()
+
+    postal_index = build_postal_index(postal_df)
+    table = pa.Table.from_pandas(postal_index)
+    metadata = dict(table.schema.metadata or {})
+    metadata[b'postal_index_version'] = POSTAL_INDEX_VERSION.encode()
+    metadata[b'source_digest'] = source_digest.encode()
+    try:
+        pq.write_table(table.replace_schema_metadata(metadata), index_path)
+    except OSError as e:
+        logger.warning("Impossible d'écrire l'index postal %s: %s", index_path, e)
+    return postal_index
+
+
+@st.cache_data
+def load_postal_index(source_digest: str, index_path: str = POSTAL_INDEX_PATH) -> pd.DataFrame:
+    """Charge l'index postal précompilé, le recompile s'il est absent ou périmé.
+
+    source_digest (file_digest du CSV des codes postaux) fait partie de la clé
+    du cache: un CSV modifié donne une nouvelle entrée, jamais l'ancien index.
+    """
+    cache_miss()
+    try:
+        table = pq.read_table(index_path, memory_map=True)
+        metadata = table.schema.metadata or {}
+        # Sans CSV source (déploiement de l'index seul), l'index existant fait foi
+        a_jour = source_digest in ('absent', metadata.get(b'source_digest', b'').decode())
+        if metadata.get(b'postal_index_version') == POSTAL_INDEX_VERSION.encode() and a_jour:
+            return table.to_pandas()
+    except (OSError, pa.ArrowException):
+        pass
+    return compile_postal_index(index_path, source_digest)
+
+
+def enrich_with_geo_data(df: pd.DataFrame, postal_index: pd.DataFrame) -> pd.DataFrame:
+    """Enrichit les données avec l'index postal (jointure sur le nom de ville normalisé)"""
+    if postal_index.empty or 'localisation_potentielle' not in df.columns:
+        return df
+
+    # Normaliser le nom de ville dans les formations
+    ville_normalized = df['localisation_potentielle'].str.strip().str.lower()
+
+    # Une seule recherche par ville dans l'index
+    geo = postal_index.reindex(ville_normalized.to_numpy()).set_axis(df.index)
+    df = pd.concat([df, geo], axis=1)
+
+    # Utiliser province_geo si province manquante ou "Non spécifié"
+    if 'province' in df.columns:
+        province = df['province'].astype(object)
+        manquante = province.isna() | (province == 'Non spécifié')
+        df['province'] = province.where(~(manquante & df['province_geo'].notna()), df['province_geo'])
+    else:
+        df['province'] = df['province_geo']
+
+    return apply_schema(df)
+
+
+def split_geo_points(geo_points: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """Découpe les "_Geo Point" 'lat, lon' en deux colonnes float (NaN si invalide)"""
+    geo = geo_points.astype(object).where(geo_points.notna(), "").astype(str)
+    parts = geo.str.split(',', n=2, expand=True).reindex(columns=[0, 1, 2])
+
+    lat = pd.to_numeric(parts[0].astype(object), errors='coerce')
+    lon = pd.to_numeric(parts[1].astype(object), errors='coerce')
+
+    # Exactement deux composantes numériques, sinon le point entier est invalide
+    valide = parts[2].isna() & lat.notna() & lon.notna()
+    return lat.where(valide).astype(float), lon.where(valide).astype(float)
+
+
+if __name__ == "__main__":
+    # Étape de build: python -m cadastre.geo
+    index = compile_postal_index()
+    print(f"{len(index)} villes indexées dans {POSTAL_INDEX_PATH}")
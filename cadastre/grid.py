@@ -0,0 +1,28 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+PAGE_SIZES = [25, 50, 100, 250]
+
+
+def sort_rows(data: pd.DataFrame, rows: np.ndarray, col: str, ascending: bool = True) -> np.ndarray:
+    """Réordonne les indices filtrés selon une colonne (tri stable, manquants en fin)"""
+    values = data[col].iloc[rows].reset_index(drop=True)
+    order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    return rows[order]
+
+
+def page_count(n_rows: int, page_size: int) -> int:
+    return max(1, math.ceil(n_rows / page_size))
+
+
+def page_slice(data: pd.DataFrame, rows: np.ndarray, columns, page: int, page_size: int) -> pd.DataFrame:
+    """Seules les lignes de la page demandée (page à partir de 1) sont extraites"""
+    start = (page - 1) * page_size
+    window = rows[start:start + page_size]
+    positions = [data.columns.get_loc(c) for c in columns]
+    page_df = data.iloc[window, positions]
+    # Numérotation dans la sélection filtrée plutôt que l'index du fichier source
+    page_df.index = pd.RangeIndex(start + 1, start + 1 + len(window), name="N°")
+    return page_df
@@ -0,0 +1,156 @@
+import functools
+import math
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cadastre.communes import COMMUNES_WALLONNES
+from cadastre.files import read_csv
+from cadastre.matching import ProvinceMatcher, sans_accents
+from cadastre.schema import apply_schema, to_boolean
+
+# Configuration des provinces wallonnes avec coordonnées approximatives
+PROVINCES_WALLONNES = {
+    "Hainaut": {"lat": 50.4, "lon": 3.8, "color": "#1f77b4"},
+    "Liège": {"lat": 50.6, "lon": 5.6, "color": "#ff7f0e"},
+    "Namur": {"lat": 50.5, "lon": 4.9, "color": "#2ca02c"},
+    "Luxembourg": {"lat": 50.0, "lon": 5.5, "color": "#d62728"},
+    "Brabant wallon": {"lat": 50.7, "lon": 4.6, "color": "#9467bd"}
+}
+
+VILLES_PROVINCES = {
+    "Liège": "Liège", "Verviers": "Liège", "Huy": "Liège",
+    "Namur": "Namur", "Dinant": "Namur", "Gembloux": "Namur",
+    "Charleroi": "Hainaut", "Mons": "Hainaut", "Tournai": "Hainaut", "Mouscron": "Hainaut",
+    "Arlon": "Luxembourg", "Bastogne": "Luxembourg", "Virton": "Luxembourg", "Marche-en-Famenne": "Luxembourg",
+    "Wavre": "Brabant wallon", "Nivelles": "Brabant wallon", "Jodoigne": "Brabant wallon"
+}
+
+# Facteurs de conversion en heures par unité (mots sans accents, en minuscules)
+DUREE_UNITES = {
+    **dict.fromkeys(("an", "ans", "annee", "annees"), 1000),  # Approximation
+    **dict.fromkeys(("mois",), 120),
+    **dict.fromkeys(("sem", "semaine", "semaines"), 35),
+    **dict.fromkeys(("j", "jour", "jours", "journee", "journees"), 7),
+    **dict.fromkeys(("h", "heure", "heures"), 1),
+    **dict.fromkeys(("min", "minute", "minutes"), 1 / 60),
+}
+
+# Nombre (décimale à point ou virgule), borne haute optionnelle ("10-12", "10 à 12"), unité.
+# Appliquée au texte sans accents: "à" y devient "a"
+_DUREE = re.compile(r"""
+    (?P<min>\d+(?:[.,]\d+)?)
+    (?:\s*(?:-|–|a)\s*(?P<max>\d+(?:[.,]\d+)?))?
+    \s*(?P<unite>[^\W\d_]+)?
+""", re.VERBOSE)
+
+
+def load_data(path) -> pd.DataFrame:
+    """Charge les données CSV avec le bon séparateur et nettoie les colonnes"""
+    try:
+        # Séparateur et encodage détectés sur un échantillon, puis une seule lecture complète
+        df = read_csv(path, name=getattr(path, "name", None))
+
+        # Nettoyage des noms de colonnes
+        df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+
+        return apply_schema(derive_columns(df))
+    except Exception as e:
+        st.error(f"Erreur de chargement: {e}")
+        raise
+
+
+def derive_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Calcule province, duree_h et categorie_duree par opérations vectorisées"""
+    # Extraction de la province depuis localisation_potentielle
+    if 'localisation_potentielle' in df.columns:
+        df['province'] = extract_province_vectorized(df['localisation_potentielle'])
+
+    # Normalisation de la durée
+    if 'duree' in df.columns:
+        df['duree_h'] = parse_durees(df['duree'])
+
+    # Catégorisation de la durée
+    if 'courte' in df.columns and 'moyenne' in df.columns and 'longue' in df.columns:
+        df['categorie_duree'] = categorize_duree(df)
+
+    return df
+
+
+def _motifs_province():
+    """Motifs par priorité: villes historiques, communes wallonnes, noms de provinces"""
+    motifs = [(ville, province, False) for ville, province in VILLES_PROVINCES.items()]
+    for commune, province in COMMUNES_WALLONNES.items():
+        for variante in dict.fromkeys([commune, sans_accents(commune)]):
+            if variante not in VILLES_PROVINCES:
+                motifs.append((variante, province, True))
+    motifs += [(province, province, False) for province in PROVINCES_WALLONNES]
+    return motifs
+
+
+PROVINCE_MATCHER = ProvinceMatcher(_motifs_province())
+
+
+def extract_province(localisation):
+    """Extrait la province depuis la localisation"""
+    return PROVINCE_MATCHER.match(localisation)
+
+
+def extract_province_vectorized(localisations: pd.Series) -> pd.Series:
+    """Équivalent colonne de extract_province, évalué une fois par valeur distincte"""
+    codes, valeurs = pd.factorize(localisations)
+    provinces = np.array([PROVINCE_MATCHER.match(v) for v in valeurs] + [PROVINCE_MATCHER.defaut], dtype=object)
+    # Les valeurs manquantes ont le code -1, soit la dernière entrée (province par défaut)
+    return pd.Series(provinces[codes], index=localisations.index)
+
+
+def parse_duree(duree_str):
+    """Parse la durée en heures entières ("6 Mois" -> 720, "1,5 an" -> 1500, "10-12 h" -> 11)"""
+    if pd.isna(duree_str):
+        return None
+    return _heures(str(duree_str))
+
+
+@functools.lru_cache(maxsize=4096)
+def _heures(duree: str):
+    match = _DUREE.search(sans_accents(duree).lower())
+    if match is None:
+        return None
+
+    nb = float(match['min'].replace(',', '.'))
+    if match['max']:
+        # Fourchette: on retient le milieu
+        nb = (nb + float(match['max'].replace(',', '.'))) / 2
+
+    # Sans unité reconnue, le nombre est considéré comme des heures
+    facteur = DUREE_UNITES.get(match['unite'], 1)
+    return int(math.floor(nb * facteur + 0.5))
+
+
+def parse_durees(durees: pd.Series) -> pd.Series:
+    """Équivalent colonne de parse_duree, évalué une fois par valeur distincte"""
+    codes, valeurs = pd.factorize(durees)
+    heures = np.array([parse_duree(v) for v in valeurs] + [None], dtype=float)
+    # Les valeurs manquantes ont le code -1, soit la dernière entrée (NaN)
+    result = pd.Series(heures[codes], index=durees.index)
+    # apply() renvoie des entiers tant qu'aucune durée n'est manquante
+    if not result.isna().any():
+        result = result.astype('int64')
+    return result
+
+
+def categorize_duree(df: pd.DataFrame) -> pd.Series:
+    """Catégorie de durée depuis les indicateurs courte/moyenne/longue (OUI/NON ou booléens)"""
+    categories = np.select(
+        [_mask(to_boolean(df['courte'])), _mask(to_boolean(df['moyenne'])), _mask(to_boolean(df['longue']))],
+        ['Courte', 'Moyenne', 'Longue'],
+        default='Non spécifié'
+    )
+    return pd.Series(categories, index=df.index)
+
+
+def _mask(condition: pd.Series) -> np.ndarray:
+    """Convertit une condition pandas en masque numpy (valeurs manquantes = False)"""
+    return condition.to_numpy(dtype=bool, na_value=False)
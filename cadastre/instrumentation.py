@@ -0,0 +1,126 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Étape en cours dans ce thread, pour que les fonctions en cache puissent signaler un calcul
+_courante = threading.local()
+
+
+class Recorder:
+    """Mesures des étapes d'une exécution du script (durée, lignes, cache, allocations).
+
+    Désactivé, stage() renvoie un contexte vide partagé: le coût se limite à
+    un appel de méthode par étape. Les allocations ne sont mesurées que si
+    tracemalloc est actif (il ralentit tout le processus).
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.records = []
+        self.top_level = []  # étapes hors de toute autre étape: seules comptées dans le total
+
+    def stage(self, name: str, rows=None, cached: bool = False):
+        if not self.enabled:
+            return _NOOP
+        return _Stage(self, name, rows, cached)
+
+    def frame(self) -> pd.DataFrame:
+        return pd.DataFrame(self.records, columns=["étape", "durée (ms)", "lignes", "cache", "alloué (Ko)"])
+
+    def total_ms(self) -> float:
+        return round(sum(r["durée (ms)"] or 0 for r in self.top_level), 2)
+
+    def log(self, **context) -> None:
+        """Une ligne JSON par exécution du script"""
+        if self.enabled and self.records:
+            logger.info(json.dumps({**context, "total_ms": self.total_ms(), "stages": self.records},
+                                   ensure_ascii=False, default=str))
+
+
+class _Stage:
+    def __init__(self, recorder, name, rows, cached):
+        self.recorder = recorder
+        self.record = {"étape": name, "durée (ms)": None, "lignes": rows,
+                       "cache": "hit" if cached else None, "alloué (Ko)": None}
+
+    def rows(self, n) -> None:
+        """n ou fonction renvoyant n (évaluée seulement si l'instrumentation est active)"""
+        self.record["lignes"] = int(n() if callable(n) else n)
+
+    def miss(self) -> None:
+        self.record["cache"] = "miss"
+
+    def __enter__(self):
+        self.parent = getattr(_courante, "stage", None)
+        _courante.stage = self
+        # Enregistrée dès l'entrée: une étape précède ses sous-étapes dans le tableau
+        self.recorder.records.append(self.record)
+        if self.parent is None:
+            self.recorder.top_level.append(self.record)
+        else:
+            self.record["étape"] = "↳ " + self.record["étape"]
+        if tracemalloc.is_tracing():
+            self.alloc_start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record["durée (ms)"] = round((time.perf_counter() - self.start) * 1000, 2)
+        if tracemalloc.is_tracing() and hasattr(self, "alloc_start"):
+            self.record["alloué (Ko)"] = round((tracemalloc.get_traced_memory()[1] - self.alloc_start) / 1024, 1)
+        _courante.stage = self.parent
+        return False
+
+
+class _NoopStage:
+    def rows(self, n) -> None:
+        pass
+
+    def miss(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopStage()
+
+
+def sub_stage(name: str):
+    """Sous-étape de l'étape en cours (corps d'une fonction en cache); contexte vide sinon"""
+    stage = getattr(_courante, "stage", None)
+    if stage is None:
+        return _NOOP
+    return stage.recorder.stage(name)
+
+
+def configure_logging() -> None:
+    """Affiche les journaux INFO du paquet cadastre (mesures JSON, format des CSV, deltas, évictions).
+
+    Sans cela, le logger racine reste au niveau WARNING et ces lignes sont perdues.
+    Idempotent: un seul handler est ajouté par processus.
+    """
+    package = logging.getLogger("cadastre")
+    if not any(getattr(h, "_cadastre", False) for h in package.handlers):
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s"))
+        handler._cadastre = True
+        package.addHandler(handler)
+    package.setLevel(logging.INFO)
+
+
+def cache_miss() -> None:
+    """À appeler dans le corps d'une fonction en cache: l'étape en cours devient un miss"""
+    stage = getattr(_courante, "stage", None)
+    if stage is not None:
+        stage.miss()
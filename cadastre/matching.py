@@ -0,0 +1,93 @@
+import unicodedata
+from collections import deque
+
+import pandas as pd
+
+
+class ProvinceMatcher:
+    """Automate Aho–Corasick construit une fois sur tous les noms de villes et provinces.
+
+    Les motifs sont donnés par ordre de priorité: comme la boucle historique
+    d'extract_province, c'est le premier motif de la liste présent dans le
+    texte qui l'emporte, quelle que soit sa position. Un motif ``mot_entier``
+    ne correspond qu'à un mot complet (pas "Spa" dans "Espace").
+    """
+
+    def __init__(self, motifs, defaut="Non spécifié"):
+        self.defaut = defaut
+        self._valeurs = []
+        self._transitions = [{}]
+        # Par nœud: (priorité, longueur, mot_entier) triés par priorité croissante
+        self._sorties = [[]]
+
+        for priorite, (nom, valeur, mot_entier) in enumerate(motifs):
+            nom = nom.lower()
+            noeud = 0
+            for ch in nom:
+                suivant = self._transitions[noeud].get(ch)
+                if suivant is None:
+                    suivant = len(self._transitions)
+                    self._transitions[noeud][ch] = suivant
+                    self._transitions.append({})
+                    self._sorties.append([])
+                noeud = suivant
+            self._sorties[noeud].append((priorite, len(nom), mot_entier))
+            self._valeurs.append(valeur)
+
+        self._construire_liens_echec()
+
+    def _construire_liens_echec(self):
+        self._echecs = [0] * len(self._transitions)
+        file = deque(self._transitions[0].values())
+        while file:
+            noeud = file.popleft()
+            for ch, suivant in self._transitions[noeud].items():
+                echec = self._echecs[noeud]
+                while echec and ch not in self._transitions[echec]:
+                    echec = self._echecs[echec]
+                self._echecs[suivant] = self._transitions[echec].get(ch, 0)
+                file.append(suivant)
+        # Chaque nœud hérite des motifs reconnus par son suffixe (ordre BFS: parents d'abord)
+        ordre = deque([0])
+        while ordre:
+            noeud = ordre.popleft()
+            if noeud:
+                self._sorties[noeud] = sorted(self._sorties[noeud] + self._sorties[self._echecs[noeud]])
+            ordre.extend(self._transitions[noeud].values())
+
+    def match(self, texte) -> str:
+        """Valeur du motif le plus prioritaire présent dans le texte"""
+        if pd.isna(texte):
+            return self.defaut
+        texte = str(texte).strip().lower()
+        if not texte:
+            return self.defaut
+
+        meilleur = len(self._valeurs)
+        noeud = 0
+        for fin, ch in enumerate(texte, start=1):
+            while noeud and ch not in self._transitions[noeud]:
+                noeud = self._echecs[noeud]
+            noeud = self._transitions[noeud].get(ch, 0)
+            for priorite, longueur, mot_entier in self._sorties[noeud]:
+                if priorite >= meilleur:
+                    break
+                if mot_entier and not _est_mot_entier(texte, fin - longueur, fin):
+                    continue
+                meilleur = priorite
+                break
+            if meilleur == 0:
+                break
+
+        return self._valeurs[meilleur] if meilleur < len(self._valeurs) else self.defaut
+
+
+def _est_mot_entier(texte: str, debut: int, fin: int) -> bool:
+    return ((debut == 0 or not texte[debut - 1].isalnum())
+            and (fin == len(texte) or not texte[fin].isalnum()))
+
+
+def sans_accents(texte: str) -> str:
+    """Retire les diacritiques ("Écaussinnes" -> "Ecaussinnes", "Belœil" -> "Beloeil")"""
+    texte = texte.replace("œ", "oe").replace("Œ", "Oe")
+    return "".join(c for c in unicodedata.normalize("NFKD", texte) if not unicodedata.combining(c))
@@ -0,0 +1,63 @@
+import pandas as pd
+
+# Indicateurs OUI/NON du cadastre, stockés en booléens (NA si ni OUI ni NON)
+BOOLEAN_COLUMNS = ("courte", "moyenne", "longue", "qualifiante", "certifiante")
+
+# Colonnes à faible cardinalité: un code entier par ligne au lieu d'une chaîne
+CATEGORICAL_COLUMNS = (
+    "type_organisme", "abreviation", "denomination_sociale", "denomination_commerciale",
+    "localisation_potentielle", "public", "province", "categorie_duree",
+    "ville", "arrondissement", "province_geo",
+)
+
+INTEGER_COLUMNS = ("duree_h",)
+
+FLOAT32_COLUMNS = ("latitude", "longitude")
+
+_OUI_NON = {"OUI": True, "NON": False}
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes connues vers leur type compact (sans effet si déjà typées)"""
+    types = {}
+    for col in BOOLEAN_COLUMNS:
+        if col in df.columns and df[col].dtype != "boolean":
+            df[col] = to_boolean(df[col])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            types[col] = "category"
+    for col in INTEGER_COLUMNS:
+        if col in df.columns:
+            types[col] = "Int32"
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            types[col] = "float32"
+    return df.astype(types) if types else df
+
+
+def to_boolean(values: pd.Series) -> pd.Series:
+    """OUI/NON (casse et espaces ignorés) -> booléen nullable"""
+    if pd.api.types.is_bool_dtype(values.dtype):
+        return values.astype("boolean")
+    texte = values.astype(object).where(values.notna(), "").astype(str).str.strip().str.upper()
+    return texte.map(_OUI_NON).astype("boolean")
+
+
+def is_true(value) -> bool:
+    """Vrai pour un indicateur à True (False pour NA)"""
+    return bool(value) if pd.notna(value) else False
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Mémoire (octets, profonde) par colonne avant et après typage"""
+    avant = before.memory_usage(deep=True, index=False)
+    apres = after.memory_usage(deep=True, index=False).reindex(avant.index)
+    report = pd.DataFrame({
+        "type avant": before.dtypes.astype(str),
+        "type après": after.dtypes.reindex(avant.index).astype(str),
+        "avant": avant,
+        "après": apres,
+    })
+    report.loc["TOTAL"] = ["", "", avant.sum(), apres.sum()]
+    report["gain %"] = (100 * (1 - report["après"] / report["avant"])).round(1)
+    return report
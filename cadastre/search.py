@@ -0,0 +1,144 @@
+import bisect
+import math
+import re
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from cadastre.delta import incremental_build
+from cadastre.instrumentation import cache_miss
+from cadastre.matching import sans_accents
+
+# Poids des champs indexés: un terme trouvé dans l'intitulé compte davantage
+SEARCH_FIELDS = {
+    "intitule": 3.0,
+    "denomination_sociale": 1.0,
+    "public": 0.5,
+    "condition_specifique": 0.5,
+}
+
+# Un terme qui n'est que le préfixe d'un mot vaut moins qu'un mot complet
+PREFIX_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"\w+")
+
+
+def tokenize(texte) -> list:
+    """Mots en minuscules et sans accents ("Sécurité" -> "securite")"""
+    return _TOKEN.findall(sans_accents(str(texte)).lower())
+
+
+class SearchIndex:
+    """Index inversé mot -> lignes, avec recherche par préfixe et classement.
+
+    Chaque mot est associé aux positions des lignes qui le contiennent et au
+    poids du meilleur champ où il apparaît. Les termes d'une requête sont
+    combinés par ET; le score d'une ligne est la somme, par terme, du poids
+    du champ multiplié par l'idf du mot.
+    """
+
+    def __init__(self, df: pd.DataFrame, fields: dict):
+        self._indexer(len(df), _postings(df, fields))
+
+    def _indexer(self, n_rows: int, postings: dict) -> None:
+        self.n_rows = n_rows
+        self._postings = postings
+        self._idf = {mot: math.log(1 + n_rows / len(lignes)) for mot, (lignes, _) in postings.items()}
+        self._vocabulaire = sorted(postings)
+
+    def patched(self, patch, df: pd.DataFrame, fields: dict) -> "SearchIndex":
+        """Index du jeu mis à jour: postings existants renumérotés, seules les lignes ajoutées sont découpées"""
+        nouvelles = patch.new_positions()
+        postings = {}
+        for mot, (lignes, poids) in self._postings.items():
+            lignes = nouvelles[lignes]
+            garde = lignes >= 0
+            if garde.any():
+                postings[mot] = (lignes[garde], poids[garde])
+        # Lignes ajoutées en fin de jeu: la concaténation garde les postings triés
+        added = patch.added
+        for mot, (lignes, poids) in _postings(df.iloc[added], fields).items():
+            if mot in postings:
+                anciennes, anciens_poids = postings[mot]
+                postings[mot] = (np.concatenate([anciennes, added[lignes]]), np.concatenate([anciens_poids, poids]))
+            else:
+                postings[mot] = (added[lignes], poids)
+        index = SearchIndex.__new__(SearchIndex)
+        index._indexer(len(df), postings)
+        return index
+
+    def search(self, query: str, rows=None) -> np.ndarray:
+        """Positions des lignes contenant tous les termes (par préfixe), triées par pertinence"""
+        lignes = None
+        for terme in tokenize(query):
+            terme_lignes, terme_scores = self._scores_terme(terme)
+            if lignes is None:
+                lignes, scores = terme_lignes, terme_scores
+            else:
+                lignes, ia, ib = np.intersect1d(lignes, terme_lignes, assume_unique=True, return_indices=True)
+                scores = scores[ia] + terme_scores[ib]
+
+        if lignes is None:
+            return np.arange(self.n_rows) if rows is None else rows
+        if rows is not None:
+            lignes, ia, _ = np.intersect1d(lignes, rows, assume_unique=True, return_indices=True)
+            scores = scores[ia]
+        return lignes[np.argsort(-scores, kind="stable")]
+
+    def _scores_terme(self, terme: str):
+        debut = bisect.bisect_left(self._vocabulaire, terme)
+        fin = bisect.bisect_left(self._vocabulaire, terme + "\uffff", lo=debut)
+        if debut == fin:
+            return np.array([], dtype=np.intp), np.array([], dtype=np.float32)
+
+        mots = self._vocabulaire[debut:fin]
+        lignes = np.concatenate([self._postings[mot][0] for mot in mots])
+        scores = np.concatenate([
+            self._postings[mot][1] * (self._idf[mot] if mot == terme else self._idf[mot] * PREFIX_WEIGHT)
+            for mot in mots
+        ])
+        return _max_par_ligne(lignes, scores)
+
+
+def _postings(df: pd.DataFrame, fields: dict) -> dict:
+    """mot -> (positions triées des lignes, poids du meilleur champ où il apparaît)"""
+    postings = {}
+    for col, poids in fields.items():
+        if col not in df.columns:
+            continue
+        # Chaque texte distinct n'est découpé qu'une seule fois
+        codes, textes = pd.factorize(df[col])
+        ordre = np.argsort(codes, kind="stable")
+        bornes = np.searchsorted(codes[ordre], np.arange(len(textes) + 1))
+        for i, texte in enumerate(textes):
+            lignes = ordre[bornes[i]:bornes[i + 1]]
+            for mot in set(tokenize(texte)):
+                postings.setdefault(mot, []).append((lignes, poids))
+
+    result = {}
+    for mot, parts in postings.items():
+        lignes = np.concatenate([l for l, _ in parts])
+        poids = np.concatenate([np.full(len(l), p, dtype=np.float32) for l, p in parts])
+        result[mot] = _max_par_ligne(lignes, poids)
+    return result
+
+
+def _max_par_ligne(lignes: np.ndarray, scores: np.ndarray):
+    """Déduplique les lignes en gardant le meilleur score (lignes triées en sortie)"""
+    ordre = np.lexsort((-scores, lignes))
+    lignes, scores = lignes[ordre], scores[ordre]
+    premiers = np.r_[True, lignes[1:] != lignes[:-1]]
+    return lignes[premiers], scores[premiers]
+
+
+@st.cache_resource(max_entries=8)
+def build_search_index(dataset_key: str, _df: pd.DataFrame, fields: tuple) -> SearchIndex:
+    """Index de recherche construit une fois par jeu de données (identifié par sa clé).
+
+    Un jeu issu d'un delta reprend l'index de la version précédente.
+    """
+    cache_miss()
+    return incremental_build(("recherche", fields), dataset_key, _df,
+                             build=lambda df: SearchIndex(df, dict(fields)),
+                             patch=lambda index, delta_patch, df: index.patched(delta_patch, df, dict(fields)))